@@ -0,0 +1,50 @@
+"""Micro-benchmark of decoding klines responses into Klines.
+
+Compares the general JSON decoders (stdlib, orjson, msgspec when installed) followed by
+Klines.from_rows with the specialized Klines.from_json, both with the byte pattern (pattern)
+and with the msgspec struct decoder (struct).
+
+Usage: python benchmarks/bench_decode.py [--repeat=100]
+"""
+import argparse
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import hotcold  # noqa: E402
+from bench_scan import generate_klines  # noqa: E402
+
+
+def main(args: argparse.Namespace):
+    decoders = {'json': json.loads}
+    if hotcold.orjson is not None:
+        decoders['orjson'] = hotcold.orjson.loads
+    if hotcold.msgspec is not None:
+        decoders['msgspec'] = hotcold.msgspec.json.decode
+
+    rows_decoder = hotcold.KLINE_ROWS_DECODER
+    print(f"{'candles':>8} " + " ".join(f"{name:>10}" for name in decoders) + f" {'pattern':>10} {'struct':>10}"
+          + "   (ms per response)")
+    for count in (100, 500, 1500):
+        body = json.dumps(generate_klines('BENCHUSDT', '1m', count), separators=(',', ':')).encode()
+        timings = [timeit.timeit(lambda: hotcold.Klines.from_rows(decode(body)), number=args.repeat)
+                   for decode in decoders.values()]
+        hotcold.KLINE_ROWS_DECODER = None
+        timings.append(timeit.timeit(lambda: hotcold.Klines.from_json(body), number=args.repeat))
+        hotcold.KLINE_ROWS_DECODER = rows_decoder
+        cells = [f"{timing / args.repeat * 1000:>10.3f}" for timing in timings]
+        if rows_decoder is not None:
+            timing = timeit.timeit(lambda: hotcold.Klines.from_json(body), number=args.repeat)
+            cells.append(f"{timing / args.repeat * 1000:>10.3f}")
+        else:
+            cells.append('       n/a')
+        print(f"{count:>8} " + " ".join(cells))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark decoding of klines responses.')
+    parser.add_argument('--repeat', type=int, default=100, help='Number of runs per measurement')
+    main(parser.parse_args())
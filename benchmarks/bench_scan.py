@@ -0,0 +1,321 @@
+"""End-to-end benchmark of a scan against a local fake of the Binance Futures API.
+
+The fake server runs in a separate process and serves exchangeInfo and klines either generated
+(a deterministic random walk per symbol) or recorded from the real API with --record. Recorded
+candles are shifted in time so the last one is always the current candle. Latency, jitter,
+failing requests and the per-minute weight limit (with the X-MBX-USED-WEIGHT-1M header and 429
+responses above it) are configurable. `/stream` stands in for the combined kline streams, it
+replays recorded frames (see bench_stream.py) shifted to the current time.
+
+Every run calls hotcold.main() with a cold in-memory cache and reports wall time, requests and
+bytes served, CPU time spent in the analysis and peak memory of the scanning process.
+
+Usage:
+    python benchmarks/bench_scan.py [--symbols=200] [--latency=0.05] [--jitter=0.02] [--runs=3] -- 20m 4h 3d
+    python benchmarks/bench_scan.py --record=fixtures.json -- 20m 4h 3d
+    python benchmarks/bench_scan.py --fixtures=fixtures.json -- 20m 4h 3d
+"""
+import argparse
+import asyncio
+import io
+import json
+import multiprocessing
+import os
+import random
+import resource
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+import aiohttp
+from aiohttp import web
+from rich.console import Console
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import hotcold  # noqa: E402
+
+
+def generate_klines(symbol: str, interval: str, count: int = hotcold.KLINES_MAX_LIMIT) -> List[List[Any]]:
+    # Same candles for the same symbol and interval on every run
+    rnd = random.Random(f"{symbol}:{interval}")
+    interval_ms = hotcold.parse_timeframe(interval) * 60_000
+    volatility = 0.002 * hotcold.parse_timeframe(interval) ** 0.5
+    price = rnd.uniform(0.1, 1000)
+    rows = []
+    for i in range(count):
+        open_ = price
+        price *= 1 + rnd.gauss(0, volatility)
+        high = max(open_, price) * (1 + abs(rnd.gauss(0, volatility / 2)))
+        low = min(open_, price) * (1 - abs(rnd.gauss(0, volatility / 2)))
+        rows.append([i * interval_ms, f"{open_:.6f}", f"{high:.6f}", f"{low:.6f}", f"{price:.6f}",
+                     f"{rnd.uniform(100, 10000):.1f}", (i + 1) * interval_ms - 1, "0", 100, "0", "0", "0"])
+    return rows
+
+
+class FakeBinance:
+    def __init__(self, fixtures_path: Optional[str], symbols: int, intervals: List[str], latency: float,
+                 jitter: float, error_rate: float, weight_limit: int, frames_path: Optional[str] = None,
+                 frame_interval: float = 0.1):
+        fixtures = None
+        if fixtures_path:
+            with open(fixtures_path) as file:
+                fixtures = json.load(file)
+        self.fixtures = fixtures
+        self.frames: List[Dict[str, Any]] = []
+        if frames_path:
+            with open(frames_path) as file:
+                self.frames = json.load(file)
+        self.frame_interval = frame_interval
+        self.symbols = list(fixtures['klines']) if fixtures else [f"SYM{i}USDT" for i in range(symbols)]
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.weight_limit = weight_limit
+        # Generated up front, so the first run doesn't measure the server
+        self.generated: Dict[tuple, List[List[Any]]] = {} if fixtures else {
+            (symbol, interval): generate_klines(symbol, interval) for symbol in self.symbols for interval in intervals
+        }
+        self.minute = 0
+        self.minute_weight = 0
+        self.stats = {'requests': 0, 'bytes': 0, 'weight': 0, 'errors': 0, 'throttled': 0, 'frames': 0}
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get('/fapi/v1/exchangeInfo', self.exchange_info)
+        app.router.add_get('/fapi/v1/klines', self.klines)
+        app.router.add_get('/stream', self.stream)
+        app.router.add_get('/stats', self.get_stats)
+        app.router.add_post('/stats/reset', self.reset_stats)
+        return app
+
+    async def respond(self, data: Any, weight: int) -> web.Response:
+        await asyncio.sleep(max(self.latency + random.uniform(-self.jitter, self.jitter), 0))
+        self.stats['requests'] += 1
+        minute = int(time.time() // 60)
+        if minute != self.minute:
+            self.minute, self.minute_weight = minute, 0
+        self.minute_weight += weight
+        self.stats['weight'] += weight
+        headers = {'X-MBX-USED-WEIGHT-1M': str(self.minute_weight)}
+        if self.minute_weight > self.weight_limit:
+            self.stats['throttled'] += 1
+            return web.Response(status=429, headers={**headers, 'Retry-After': str(60 - int(time.time() % 60))})
+        if random.random() < self.error_rate:
+            self.stats['errors'] += 1
+            return web.Response(status=503, headers=headers)
+        body = json.dumps(data, separators=(',', ':')).encode()
+        self.stats['bytes'] += len(body)
+        return web.Response(body=body, content_type='application/json', headers=headers)
+
+    async def exchange_info(self, request: web.Request) -> web.Response:
+        if self.fixtures:
+            return await self.respond(self.fixtures['exchangeInfo'], 1)
+        return await self.respond({'symbols': [{'symbol': symbol, 'quoteAsset': 'USDT', 'status': 'TRADING'}
+                                               for symbol in self.symbols]}, 1)
+
+    async def klines(self, request: web.Request) -> web.Response:
+        symbol, interval = request.query['symbol'], request.query['interval']
+        limit = int(request.query.get('limit', 500))
+        rows = self.candles(symbol, interval)
+        if 'startTime' in request.query:
+            start_time = int(request.query['startTime'])
+            rows = [row for row in rows if row[0] >= start_time][:limit]
+        else:
+            rows = rows[-limit:]
+        return await self.respond(rows, hotcold.kline_weight(limit))
+
+    def candles(self, symbol: str, interval: str) -> List[List[Any]]:
+        if self.fixtures:
+            rows = self.fixtures['klines'].get(symbol, {}).get(interval, [])
+        else:
+            key = (symbol, interval)
+            if key not in self.generated:
+                self.generated[key] = generate_klines(symbol, interval)
+            rows = self.generated[key]
+        if not rows:
+            return rows
+        # Move the candles so the last one is the current (still open) candle
+        interval_ms = hotcold.parse_timeframe(interval) * 60_000
+        shift = int(time.time() * 1000) // interval_ms * interval_ms - rows[-1][0]
+        return [[row[0] + shift, *row[1:6], row[6] + shift, *row[7:]] for row in rows]
+
+    async def stream(self, request: web.Request) -> web.WebSocketResponse:
+        # Replays the recorded frames of the requested streams over and over, one every frame_interval
+        streams = set(request.query.get('streams', '').split('/'))
+        frames = [frame for frame in self.frames if frame['stream'] in streams]
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+
+        async def replay():
+            while frames:
+                for frame in self.shift_frames(frames):
+                    await ws.send_str(json.dumps(frame, separators=(',', ':')))
+                    self.stats['frames'] += 1
+                    await asyncio.sleep(self.frame_interval)
+
+        # Frames are sent in the background, reading here notices when the client disconnects
+        sender = asyncio.create_task(replay())
+        try:
+            async for _ in ws:
+                pass
+        finally:
+            sender.cancel()
+        return ws
+
+    @staticmethod
+    def shift_frames(frames: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        # Move the candles of every interval so the latest recorded one is the current candle
+        now = int(time.time() * 1000)
+        latest: Dict[str, int] = {}
+        for frame in frames:
+            kline = frame['data']['k']
+            latest[kline['i']] = max(latest.get(kline['i'], 0), kline['t'])
+        shifted = []
+        for frame in frames:
+            kline = frame['data']['k']
+            interval_ms = hotcold.parse_timeframe(kline['i']) * 60_000
+            shift = now // interval_ms * interval_ms - latest[kline['i']]
+            shifted.append({**frame, 'data': {**frame['data'], 'E': now,
+                                              'k': {**kline, 't': kline['t'] + shift, 'T': kline['T'] + shift}}})
+        return shifted
+
+    async def get_stats(self, request: web.Request) -> web.Response:
+        return web.json_response(self.stats)
+
+    async def reset_stats(self, request: web.Request) -> web.Response:
+        self.stats = dict.fromkeys(self.stats, 0)
+        return web.json_response(self.stats)
+
+
+def run_server(port: int, *args):
+    # Candles are created in the server process, so they don't count in the memory of the scan
+    fake = FakeBinance(*args)
+    web.run_app(fake.app(), host='127.0.0.1', port=port, print=None, access_log=None)
+
+
+async def record_fixtures(path: str, scan_args: argparse.Namespace, symbols: int):
+    # Download exchangeInfo and the candles needed by the given intervals for the first symbols
+    async with hotcold.create_session() as session:
+        exchange_info = await hotcold.fetch_json(session, hotcold.EXCHANGE_INFO_URL, {})
+        picked = hotcold.filter_usdt_symbols(exchange_info)[:symbols]
+        exchange_info['symbols'] = [info for info in exchange_info['symbols'] if info['symbol'] in picked]
+        windows, _ = hotcold.get_profile_windows(scan_args.profiles)
+        plan = hotcold.plan_kline_requests(windows)
+        klines: Dict[str, Dict[str, Any]] = {}
+        for symbol in picked:
+            for interval in plan:
+                klines.setdefault(symbol, {})[interval] = await hotcold.fetch_json(session, hotcold.KLINES_URL, {
+                    'symbol': symbol, 'interval': interval, 'limit': hotcold.KLINES_MAX_LIMIT
+                }, hotcold.kline_weight(hotcold.KLINES_MAX_LIMIT))
+    with open(path, 'w') as file:
+        json.dump({'exchangeInfo': exchange_info, 'klines': klines}, file)
+    print(f"Recorded {len(picked)} symbols, intervals {', '.join(plan)} to {path}")
+
+
+async def fetch_server_stats(base_url: str, reset: bool = False) -> Dict[str, int]:
+    async with aiohttp.ClientSession() as session:
+        if reset:
+            async with session.post(f"{base_url}/stats/reset") as response:
+                return await response.json()
+        async with session.get(f"{base_url}/stats") as response:
+            return await response.json()
+
+
+def wait_for_server(base_url: str, timeout: float = 30):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            asyncio.run(fetch_server_stats(base_url))
+            return
+        except aiohttp.ClientConnectionError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.1)
+
+
+def point_to(base_url: str):
+    for name in ('EXCHANGE_INFO_URL', 'KLINES_URL', 'TICKER_24HR_URL', 'TICKER_PRICE_URL'):
+        setattr(hotcold, name, getattr(hotcold, name).replace('https://fapi.binance.com', base_url))
+    hotcold.STREAM_URL = f"{base_url.replace('http', 'ws', 1)}/stream"
+
+
+def measure_run(base_url: str, scan_args: argparse.Namespace) -> Dict[str, float]:
+    analysis = {'cpu': 0.0}
+    evaluate_batch = hotcold.evaluate_batch
+
+    def timed_evaluate_batch(*args, **kwargs):
+        started = time.process_time()
+        try:
+            return evaluate_batch(*args, **kwargs)
+        finally:
+            analysis['cpu'] += time.process_time() - started
+
+    asyncio.run(fetch_server_stats(base_url, reset=True))
+    hotcold.evaluate_batch = timed_evaluate_batch
+    started, cpu_started = time.perf_counter(), time.process_time()
+    try:
+        asyncio.run(hotcold.main(scan_args))
+    finally:
+        hotcold.evaluate_batch = evaluate_batch
+    wall, cpu = time.perf_counter() - started, time.process_time() - cpu_started
+    stats = asyncio.run(fetch_server_stats(base_url))
+    return {
+        'wall_s': round(wall, 3),
+        'cpu_s': round(cpu, 3),
+        'analysis_cpu_s': round(analysis['cpu'], 3),
+        **stats,
+        'failed': hotcold.REQUEST_STATS.failures,
+        # ru_maxrss is in kilobytes on Linux
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+
+def main(args: argparse.Namespace, hotcold_argv: List[str]):
+    scan_args = hotcold.parse_args(hotcold_argv)
+    if args.record:
+        asyncio.run(record_fixtures(args.record, scan_args, args.symbols))
+        return
+
+    windows, _ = hotcold.get_profile_windows(scan_args.profiles)
+    intervals = list(hotcold.plan_kline_requests(windows))
+    server = multiprocessing.Process(target=run_server, daemon=True, args=(
+        args.port, args.fixtures, args.symbols, intervals, args.latency, args.jitter, args.error_rate, args.weight_limit
+    ))
+    server.start()
+    base_url = f"http://127.0.0.1:{args.port}"
+    try:
+        wait_for_server(base_url)
+        point_to(base_url)
+        # Tables and progress would only measure the terminal
+        hotcold.console = Console(file=io.StringIO())
+
+        runs = []
+        for _ in range(args.runs):
+            runs.append(measure_run(base_url, scan_args))
+            if not args.json:
+                print(" ".join(f"{key}={value}" for key, value in runs[-1].items()))
+        if args.json:
+            print(json.dumps({'options': vars(args), 'hotcold_args': hotcold_argv, 'runs': runs}, indent=2))
+    finally:
+        server.terminate()
+
+
+if __name__ == '__main__':
+    argv = sys.argv[1:]
+    hotcold_argv = argv[argv.index('--') + 1:] if '--' in argv else ['20m', '4h', '3d']
+    argv = argv[:argv.index('--')] if '--' in argv else argv
+
+    parser = argparse.ArgumentParser(description='Benchmark scans against a local fake Binance API.')
+    parser.add_argument('--symbols', type=int, default=200, help='Number of generated (or recorded) symbols')
+    parser.add_argument('--fixtures', type=str, default=None, help='Serve candles recorded with --record')
+    parser.add_argument('--record', type=str, default=None, help='Record candles from Binance into this file and exit')
+    parser.add_argument('--latency', type=float, default=0.05, help='Response latency in seconds')
+    parser.add_argument('--jitter', type=float, default=0.02, help='Random latency added or subtracted, in seconds')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Part of requests failing with HTTP 503')
+    parser.add_argument('--weight-limit', type=int, default=hotcold.WEIGHT_LIMIT_PER_MINUTE,
+                        help='Request weight per minute before answering with HTTP 429')
+    parser.add_argument('--runs', type=int, default=3, help='Number of cold scans')
+    parser.add_argument('--port', type=int, default=18181, help='Port of the fake server')
+    parser.add_argument('--json', action='store_true', help='Print all measurements as JSON')
+    main(parser.parse_args(argv), hotcold_argv)
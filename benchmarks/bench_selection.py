@@ -0,0 +1,54 @@
+"""Micro-benchmark of the top/bottom averages used by the analysis.
+
+Compares picking both averages with a full sort (how it used to be done) with calculate_avg_extremes,
+with and without numpy.
+
+Usage: python benchmarks/bench_selection.py [--repeat=200]
+"""
+import argparse
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import hotcold  # noqa: E402
+
+
+def make_klines(count: int) -> hotcold.Klines:
+    rows = []
+    price = 100.0
+    for i in range(count):
+        price *= 1 + random.uniform(-0.002, 0.002)
+        rows.append([i * 60_000, price, price * 1.001, price * 0.999, price, 1.0])
+    return hotcold.Klines.from_rows(rows)
+
+
+def full_sort_extremes(candles: hotcold.Klines, ratio_to_pick: float):
+    picked = max(int(len(candles) * ratio_to_pick), 1)
+    top_max = sorted(candles.high, reverse=True)[:picked]
+    bottom_min = sorted(candles.low)[:picked]
+    return sum(top_max) / len(top_max), sum(bottom_min) / len(bottom_min)
+
+
+def main(args: argparse.Namespace):
+    numpy = hotcold.numpy
+    print(f"{'candles':>8} {'ratio':>6} {'full sort':>10} {'selection':>10} {'numpy':>10}   (ms per window)")
+    for count in (1000, 2000, 4000, 6000):
+        candles = make_klines(count)
+        for ratio in (0.5, 0.2, 0.01):
+            timings = [timeit.timeit(lambda: full_sort_extremes(candles, ratio), number=args.repeat)]
+            hotcold.numpy = None
+            timings.append(timeit.timeit(lambda: hotcold.calculate_avg_extremes(candles, ratio), number=args.repeat))
+            hotcold.numpy = numpy
+            if numpy is not None:
+                timings.append(timeit.timeit(lambda: hotcold.calculate_avg_extremes(candles, ratio), number=args.repeat))
+            cells = [f"{timing / args.repeat * 1000:>10.3f}" for timing in timings] + ['       n/a'] * (3 - len(timings))
+            print(f"{count:>8} {ratio:>6} " + " ".join(cells))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark top/bottom averages of candle windows.')
+    parser.add_argument('--repeat', type=int, default=200, help='Number of runs per measurement')
+    main(parser.parse_args())
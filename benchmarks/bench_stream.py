@@ -0,0 +1,113 @@
+"""Benchmark of --stream mode against the local fake of the Binance Futures API, fully offline.
+
+The fake server of bench_scan.py serves the REST API for the first scan and replays recorded kline
+stream frames on its `/stream` websocket stand-in (benchmarks/fixtures/stream_frames.json by default,
+made for the generated SYM0USDT..SYM2USDT symbols). hotcold.main() runs with --stream for the
+given duration and the number of replayed frames and re-rendered tables is reported.
+
+Frames of the real streams can be recorded with --record, together with candles recorded by
+bench_scan.py --record they replay the real market:
+
+Usage:
+    python benchmarks/bench_stream.py [--duration=10] [--frame-interval=0.1] -- 20m 4h 3d
+    python benchmarks/bench_stream.py --record=frames.json --duration=60 -- 20m 4h 3d
+    python benchmarks/bench_stream.py --fixtures=fixtures.json --frames=frames.json -- 20m 4h 3d
+"""
+import argparse
+import asyncio
+import io
+import json
+import multiprocessing
+import os
+import sys
+import time
+from typing import Any, Dict, List
+
+import aiohttp
+from rich.console import Console
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import hotcold  # noqa: E402
+from bench_scan import fetch_server_stats, point_to, run_server, wait_for_server  # noqa: E402
+
+DEFAULT_FRAMES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'stream_frames.json')
+
+
+async def record_frames(path: str, scan_args: argparse.Namespace, symbols: int, duration: float):
+    # Save the kline frames of the first symbols as they come from Binance
+    async with hotcold.create_session() as session:
+        exchange_info = await hotcold.fetch_json(session, hotcold.EXCHANGE_INFO_URL, {})
+        picked = hotcold.filter_usdt_symbols(exchange_info)[:symbols]
+        windows, _ = hotcold.get_profile_windows(scan_args.profiles)
+        streams = [f"{symbol.lower()}@kline_{interval}" for symbol in picked
+                   for interval in hotcold.plan_kline_requests(windows)]
+        frames: List[Dict[str, Any]] = []
+        async with session.ws_connect(f"{hotcold.STREAM_URL}?streams={'/'.join(streams)}") as ws:
+            finish_at = time.monotonic() + duration
+            while time.monotonic() < finish_at:
+                try:
+                    message = await ws.receive(timeout=finish_at - time.monotonic())
+                except asyncio.TimeoutError:
+                    break
+                if message.type != aiohttp.WSMsgType.TEXT:
+                    break
+                frames.append(json.loads(message.data))
+    with open(path, 'w') as file:
+        file.write('[\n' + ',\n'.join(json.dumps(frame, separators=(',', ':')) for frame in frames) + '\n]\n')
+    print(f"Recorded {len(frames)} frames of {len(picked)} symbols to {path}")
+
+
+async def run_stream(scan_args: argparse.Namespace, duration: float):
+    try:
+        await asyncio.wait_for(hotcold.main(scan_args), duration)
+    except asyncio.TimeoutError:
+        pass
+
+
+def main(args: argparse.Namespace, hotcold_argv: List[str]):
+    scan_args = hotcold.parse_args(hotcold_argv + ['--stream'])
+    if args.record:
+        asyncio.run(record_frames(args.record, scan_args, args.symbols, args.duration))
+        return
+
+    windows, _ = hotcold.get_profile_windows(scan_args.profiles)
+    intervals = list(hotcold.plan_kline_requests(windows))
+    server = multiprocessing.Process(target=run_server, daemon=True, args=(
+        args.port, args.fixtures, args.symbols, intervals, args.latency, 0.0, 0.0, hotcold.WEIGHT_LIMIT_PER_MINUTE,
+        args.frames, args.frame_interval
+    ))
+    server.start()
+    base_url = f"http://127.0.0.1:{args.port}"
+    try:
+        wait_for_server(base_url)
+        point_to(base_url)
+        output = io.StringIO()
+        hotcold.console = Console(file=output, width=120)
+
+        started = time.perf_counter()
+        asyncio.run(run_stream(scan_args, args.duration))
+        stats = asyncio.run(fetch_server_stats(base_url))
+        # Every table has its own timestamp line, the first ones are of the initial scan
+        renders = output.getvalue().count('Updated:') - len(scan_args.profiles)
+        print(f"wall_s={time.perf_counter() - started:.3f} requests={stats['requests']} frames={stats['frames']} "
+              f"stream_renders={renders}")
+    finally:
+        server.terminate()
+
+
+if __name__ == '__main__':
+    argv = sys.argv[1:]
+    hotcold_argv = argv[argv.index('--') + 1:] if '--' in argv else ['20m', '4h', '3d']
+    argv = argv[:argv.index('--')] if '--' in argv else argv
+
+    parser = argparse.ArgumentParser(description='Benchmark --stream mode against replayed kline frames.')
+    parser.add_argument('--symbols', type=int, default=20, help='Number of generated (or recorded) symbols')
+    parser.add_argument('--fixtures', type=str, default=None, help='Serve candles recorded with bench_scan.py --record')
+    parser.add_argument('--frames', type=str, default=DEFAULT_FRAMES, help='Recorded frames to replay')
+    parser.add_argument('--record', type=str, default=None, help='Record frames from Binance into this file and exit')
+    parser.add_argument('--duration', type=float, default=10.0, help='Seconds to run (or record) the stream')
+    parser.add_argument('--frame-interval', type=float, default=0.1, help='Seconds between replayed frames')
+    parser.add_argument('--latency', type=float, default=0.01, help='Response latency of the REST API in seconds')
+    parser.add_argument('--port', type=int, default=18182, help='Port of the fake server')
+    main(parser.parse_args(argv), hotcold_argv)
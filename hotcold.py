@@ -1,31 +1,244 @@
 import asyncio
+import csv
+import heapq
+from collections import deque
+import json
+import math
+import multiprocessing
+import os
+from array import array
+import random
+import signal
+import sqlite3
 import sys
-from statistics import median, mean
+import time
+import weakref
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import nullcontext
+from contextvars import ContextVar
+from statistics import median, fmean
 
 import aiohttp
+from aiohttp import web
 import argparse
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple, Deque, Callable, Set
 
-from rich.console import Console
+from rich.console import Console, Group, RenderableType
+from rich.live import Live
 from rich.table import Table
 from rich.progress import Progress, BarColumn, TimeRemainingColumn, TextColumn
 from datetime import datetime
-from dataclasses import dataclass
+from dataclasses import dataclass, field, asdict
+from urllib.parse import urlparse
 import re
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
 # Initialize Rich Console
 console = Console()
 
 # Binance Futures API Constants
 EXCHANGE_INFO_URL = 'https://fapi.binance.com/fapi/v1/exchangeInfo'
 KLINES_URL = 'https://fapi.binance.com/fapi/v1/klines'
-
-# Asynchronous semaphore to limit concurrent requests
-MAX_CONCURRENCY = 20
-SEMAPHORE = asyncio.Semaphore(MAX_CONCURRENCY)
+TICKER_24HR_URL = 'https://fapi.binance.com/fapi/v1/ticker/24hr'
+TICKER_PRICE_URL = 'https://fapi.binance.com/fapi/v1/ticker/price'
+STREAM_URL = 'wss://fstream.binance.com/stream'
+
+# Binance Futures allows up to 200 streams per websocket connection
+STREAMS_PER_CONNECTION = 200
+STREAM_RECONNECT_DELAY = 1.0
+# Minimal delay in seconds between table updates in stream mode
+STREAM_RENDER_INTERVAL = 1.0
+# Minimal delay in seconds between updates of the provisional tables shown while symbols are analyzed
+PREVIEW_RENDER_INTERVAL = 0.5
+
+# Number of concurrent requests at start, it grows up to the max while Binance accepts them
+INITIAL_CONCURRENCY = 20
+MAX_CONCURRENCY = 100
+
+# Binance Futures request weight limit per minute for one IP, and the part of it we allow ourselves to use
+WEIGHT_LIMIT_PER_MINUTE = 2400
+WEIGHT_SAFETY_RATIO = 0.9
+
+# Retries of requests failed with a timeout, connection error, 429 or 5xx
+REQUEST_TIMEOUT = 10
+MAX_RETRIES = 3
+RETRY_BASE_DELAY = 0.5
+RETRY_MAX_DELAY = 5.0
+# No retries are made later than this number of seconds after a scan cycle has started
+CYCLE_RETRY_DEADLINE = 30.0
+# At most this number of symbols cut off by --deadline are listed by name
+MISSED_SYMBOLS_SHOWN = 10
+
+# Idle connections are kept open this long (or a bit longer than --wait in watch mode) to be reused
+KEEPALIVE_TIMEOUT = 30.0
+KEEPALIVE_MARGIN = 5.0
+# Binance hosts are resolved once in this number of seconds
+DNS_CACHE_TTL = 300
+
+# Request weight of the 24hr ticker and of the price ticker for all symbols at once
+TICKER_24HR_WEIGHT = 40
+TICKER_PRICE_WEIGHT = 2
+
+# Maximum number of candles Binance returns for a single klines request
+KLINES_MAX_LIMIT = 1500
+
+# Top/bottom values are picked with a heap when fewer than 1/HEAP_SELECTION_RATIO of them are needed,
+# otherwise sorting everything is faster
+HEAP_SELECTION_RATIO = 20
+
+# Number of symbols analyzed together once their candles are downloaded
+ANALYSIS_BATCH_SIZE = 100
+
+# Share of the symbols with the lowest priority (and no booster or loser) rescanned only every --cold-every cycles
+COLD_SYMBOLS_RATIO = 0.5
+
+# Symbols from exchangeInfo are reused for this many seconds (and refreshed as often in watch mode)
+EXCHANGE_INFO_TTL = 15 * 60
+
+# First delay before a failed exchangeInfo refresh of watch mode is retried, doubled up to EXCHANGE_INFO_TTL
+EXCHANGE_INFO_RETRY_DELAY = 10
+
+# Closed candles older than this are removed from the on-disk store, unless the longest possible
+# window (KLINES_MAX_LIMIT candles) of their interval still reaches them
+KLINE_STORE_RETENTION_DAYS = 30
 
 # Type Definitions
-KlineData = List[List[Any]]
+KlineRows = List[List[Any]]
+
+
+class Klines:
+    """Candles of one symbol and interval decoded once into typed columns.
+
+    Binance sends prices as strings, they are converted to floats only when candles are added here.
+    When maxlen is set the oldest candles are dropped as new ones are merged in.
+    """
+    __slots__ = ('open_time', 'open', 'high', 'low', 'close', 'volume', 'maxlen')
+
+    def __init__(self, maxlen: Optional[int] = None):
+        self.open_time = array('q')
+        self.open = array('d')
+        self.high = array('d')
+        self.low = array('d')
+        self.close = array('d')
+        self.volume = array('d')
+        self.maxlen = maxlen
+
+    @classmethod
+    def from_rows(cls, rows: KlineRows, maxlen: Optional[int] = None) -> 'Klines':
+        klines = cls(maxlen)
+        if rows:
+            columns = list(zip(*rows))
+            klines.open_time.extend(map(int, columns[0]))
+            klines.open.extend(map(float, columns[1]))
+            klines.high.extend(map(float, columns[2]))
+            klines.low.extend(map(float, columns[3]))
+            klines.close.extend(map(float, columns[4]))
+            klines.volume.extend(map(float, columns[5]))
+            klines._trim()
+        return klines
+
+    @classmethod
+    def from_json(cls, body: bytes) -> 'Klines':
+        """Decode a klines response straight into columns, skipping the fields the analysis never reads.
+
+        msgspec decodes the prices into floats while parsing, otherwise the leading fields of every row
+        are matched in the raw bytes. Other JSON is left to the general decoder.
+        """
+        if KLINE_ROWS_DECODER is not None:
+            rows = KLINE_ROWS_DECODER.decode(body)
+            klines = cls()
+            klines.open_time.extend([row.open_time for row in rows])
+            klines.open.extend([row.open for row in rows])
+            klines.high.extend([row.high for row in rows])
+            klines.low.extend([row.low for row in rows])
+            klines.close.extend([row.close for row in rows])
+            klines.volume.extend([row.volume for row in rows])
+            return klines
+        rows = KLINE_ROW_PATTERN.findall(body)
+        # Every row is a nested array, so anything unexpected shows up as a different number of matches
+        if len(rows) != body.count(b'[') - 1:
+            return cls.from_rows(decode_json(body))
+        return cls.from_rows(rows)
+
+    def columns(self) -> Tuple[array, ...]:
+        return self.open_time, self.open, self.high, self.low, self.close, self.volume
+
+    def __len__(self) -> int:
+        return len(self.open_time)
+
+    def __getitem__(self, index: slice) -> 'Klines':
+        klines = Klines()
+        for target, source in zip(klines.columns(), self.columns()):
+            target.extend(source[index])
+        return klines
+
+    def append(self, open_time: int, open_: float, high: float, low: float, close: float, volume: float):
+        self.open_time.append(open_time)
+        self.open.append(open_)
+        self.high.append(high)
+        self.low.append(low)
+        self.close.append(close)
+        self.volume.append(volume)
+
+    def merge(self, other: 'Klines') -> bool:
+        # Append newer candles and replace the last one if it was updated, older candles are ignored
+        merged = False
+        for i in range(len(other)):
+            if not self.open_time or other.open_time[i] > self.open_time[-1]:
+                for target, source in zip(self.columns(), other.columns()):
+                    target.append(source[i])
+            elif other.open_time[i] == self.open_time[-1]:
+                for target, source in zip(self.columns(), other.columns()):
+                    target[-1] = source[i]
+            else:
+                continue
+            merged = True
+        self._trim()
+        return merged
+
+    def _trim(self):
+        excess = len(self) - self.maxlen if self.maxlen else 0
+        if excess > 0:
+            for column in self.columns():
+                del column[:excess]
+
+
+# JSON decoder for all responses, the fastest one installed
+decode_json = orjson.loads if orjson is not None else msgspec.json.decode if msgspec is not None else json.loads
+
+# Open time and the quoted open, high, low, close and volume at the start of every kline row
+KLINE_ROW_PATTERN = re.compile(rb'\[(\d+),"([^"]*)","([^"]*)","([^"]*)","([^"]*)","([^"]*)"')
+
+if msgspec is not None:
+    class KlineRow(msgspec.Struct, array_like=True):
+        # Leading fields of a kline row, the rest of it is skipped while decoding
+        open_time: int
+        open: float
+        high: float
+        low: float
+        close: float
+        volume: float
+
+    # Not strict, so prices sent as strings are decoded into floats
+    KLINE_ROWS_DECODER = msgspec.json.Decoder(List[KlineRow], strict=False)
+else:
+    KLINE_ROWS_DECODER = None
 
 
 @dataclass
@@ -55,6 +268,16 @@ def parse_timeframe(timeframe: str) -> int:
     return int(value) * multipliers[unit]
 
 
+def parse_duration(duration: str) -> float:
+    """Seconds of a duration like 3s, 1.5m or 90 (seconds when there is no unit)."""
+    match = re.match(r'^(\d+(?:\.\d+)?)([smh]?)$', duration)
+    if not match:
+        raise ValueError(f"Invalid duration format: {duration}")
+    value, unit = match.groups()
+    multipliers = {'': 1, 's': 1, 'm': 60, 'h': 3600}
+    return float(value) * multipliers[unit]
+
+
 def get_small_interval(timeframe: str) -> str:
     total_minutes = parse_timeframe(timeframe)
     if total_minutes <= 60:  # <= 1 hour
@@ -73,30 +296,903 @@ def calculate_required_candles(total_time: str, candle_interval: str) -> int:
     return max((total_minutes // candle_minutes) + 1, 1)
 
 
-async def fetch_json(session: aiohttp.ClientSession, url: str, params: Dict[str, Any]) -> Any:
+def kline_weight(limit: int) -> int:
+    # Request weight of the klines endpoint depends on the number of requested candles
+    if limit < 100:
+        return 1
+    elif limit < 500:
+        return 2
+    elif limit <= 1000:
+        return 5
+    else:
+        return 10
+
+
+def plan_kline_requests(windows: List[Tuple[str, int]]) -> Dict[str, int]:
+    """Decide which candle intervals to download (and how many candles) to cover all (interval, limit) windows.
+
+    Windows sharing an interval are served by the longest one, and coarser windows are resampled
+    from a finer download when it does not cost more request weight than a separate request.
+    """
+    plan: Dict[str, int] = {}
+    for interval, limit in windows:
+        plan[interval] = max(plan.get(interval, 0), limit)
+
+    for coarse in sorted(plan, key=parse_timeframe, reverse=True):
+        for fine in sorted(plan, key=parse_timeframe):
+            ratio, remainder = divmod(parse_timeframe(coarse), parse_timeframe(fine))
+            if ratio <= 1 or remainder:
+                continue
+            merged_limit = max(plan[fine], plan[coarse] * ratio)
+            if merged_limit > KLINES_MAX_LIMIT:
+                continue
+            if kline_weight(merged_limit) <= kline_weight(plan[fine]) + kline_weight(plan[coarse]):
+                plan[fine] = merged_limit
+                del plan[coarse]
+                break
+    return plan
+
+
+def resample_klines(candles: Klines, interval: str, limit: int) -> Klines:
+    # Merge finer candles into candles of the given interval, aligned the same way Binance aligns them
+    interval_ms = parse_timeframe(interval) * 60_000
+    resampled = Klines()
+    for open_time, open_, high, low, close, volume in zip(*candles.columns()):
+        open_time -= open_time % interval_ms
+        if resampled.open_time and resampled.open_time[-1] == open_time:
+            resampled.high[-1] = max(resampled.high[-1], high)
+            resampled.low[-1] = min(resampled.low[-1], low)
+            resampled.close[-1] = close
+            resampled.volume[-1] += volume
+        else:
+            resampled.append(open_time, open_, high, low, close, volume)
+    # The first candle is incomplete if the finer candles start in the middle of it
+    if len(resampled) > limit and candles.open_time[0] != resampled.open_time[0]:
+        resampled = resampled[1:]
+    return resampled[-limit:]
+
+
+class WeightLimiter:
+    """Token bucket that limits requests by their weight instead of their number.
+
+    The bucket is synced with the used weight Binance reports after every response. Concurrency grows
+    while requests succeed and is halved when Binance rejects requests (418/429), in which case all
+    requests are paused for the time given in Retry-After.
+    """
+
+    def __init__(self, weight_limit: int, concurrency: int, max_concurrency: int):
+        self.weight_limit = weight_limit
+        self.share = 1.0
+        self.capacity = weight_limit * WEIGHT_SAFETY_RATIO
+        self.tokens = self.capacity
+        self.concurrency = float(concurrency)
+        self.max_concurrency = max_concurrency
+        self.active = 0
+        self.waiting = 0
+        self.paused_until = 0.0
+        self.updated_at = time.monotonic()
+        self.condition = asyncio.Condition()
+
+    def set_share(self, share: float):
+        # Only this share of the weight limit of the IP is used, by one of the processes or hosts sharing it
+        self.share = share
+        self.capacity = self.weight_limit * share * WEIGHT_SAFETY_RATIO
+        self.tokens = min(self.tokens, self.capacity)
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.capacity / 60)
+        self.updated_at = now
+
+    async def acquire(self, weight: int):
+        # A request heavier than the whole bucket (with a small --weight-share) waits for a full one
+        weight = min(weight, self.capacity)
+        self.waiting += 1
+        try:
+            async with self.condition:
+                while True:
+                    self._refill()
+                    now = time.monotonic()
+                    if now < self.paused_until:
+                        timeout = self.paused_until - now
+                    elif self.active >= int(self.concurrency):
+                        timeout = None
+                    elif self.tokens >= weight:
+                        self.tokens -= weight
+                        self.active += 1
+                        return
+                    else:
+                        timeout = (weight - self.tokens) * 60 / self.capacity
+                    try:
+                        await asyncio.wait_for(self.condition.wait(), timeout)
+                    except asyncio.TimeoutError:
+                        pass
+        finally:
+            self.waiting -= 1
+
+    async def release(self, status: int, headers: Dict[str, str]):
+        async with self.condition:
+            self.active -= 1
+            used_weight = headers.get('X-MBX-USED-WEIGHT-1M')
+            if used_weight:
+                # Binance also counts requests of other clients behind our IP, their share is not ours to use
+                self._refill()
+                self.tokens = min(self.tokens, self.capacity - int(used_weight) * self.share)
+            if status in (418, 429):
+                retry_after = float(headers.get('Retry-After', 60))
+                self.paused_until = max(self.paused_until, time.monotonic() + retry_after)
+                self.concurrency = max(1.0, self.concurrency / 2)
+            elif status == 200:
+                # Additive increase, one more concurrent request per "window" of successful ones
+                self.concurrency = min(self.max_concurrency, self.concurrency + 1 / self.concurrency)
+            self.condition.notify_all()
+
+
+# Limiter of every event loop, its condition can only be awaited in the loop it was first used in
+_limiters: 'weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, WeightLimiter]' = weakref.WeakKeyDictionary()
+
+
+def get_limiter() -> WeightLimiter:
+    loop = asyncio.get_running_loop()
+    limiter = _limiters.get(loop)
+    if limiter is None:
+        limiter = _limiters[loop] = WeightLimiter(WEIGHT_LIMIT_PER_MINUTE, INITIAL_CONCURRENCY, MAX_CONCURRENCY)
+    return limiter
+
+
+class RequestError(Exception):
+    def __init__(self, message: str, retryable: bool):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+@dataclass
+class EndpointStats:
+    requests: int = 0
+    retries: int = 0
+    failures: int = 0
+    total_latency: float = 0.0
+    max_latency: float = 0.0
+
+    @property
+    def avg_latency(self) -> float:
+        return self.total_latency / self.requests if self.requests else 0.0
+
+
+@dataclass
+class RequestStats:
+    """Request counters per endpoint path for the current scan cycle."""
+    endpoints: Dict[str, EndpointStats] = field(default_factory=dict)
+    deadline: Optional[float] = None
+
+    def start_cycle(self, retry_deadline: Optional[float] = CYCLE_RETRY_DEADLINE):
+        self.endpoints = {}
+        self.deadline = time.monotonic() + retry_deadline if retry_deadline is not None else None
+
+    def endpoint(self, path: str) -> EndpointStats:
+        return self.endpoints.setdefault(path, EndpointStats())
+
+    def can_retry(self, delay: float) -> bool:
+        return self.deadline is None or time.monotonic() + delay < self.deadline
+
+    @property
+    def retries(self) -> int:
+        return sum(stats.retries for stats in self.endpoints.values())
+
+    @property
+    def failures(self) -> int:
+        return sum(stats.failures for stats in self.endpoints.values())
+
+
+REQUEST_STATS = RequestStats()
+# Stats of the scan running in the current task, the ones of main() unless a scan of --serve sets its own
+_request_stats: ContextVar[RequestStats] = ContextVar('request_stats')
+
+
+def current_request_stats() -> RequestStats:
+    return _request_stats.get(REQUEST_STATS)
+
+
+# Upper bounds (in milliseconds) of the histogram buckets of the profile
+PROFILE_BUCKETS_MS = [1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000]
+
+
+@dataclass
+class StageStats:
+    items: int = 0
+    durations: List[float] = field(default_factory=list)
+
+    def percentile(self, ratio: float) -> float:
+        ordered = sorted(self.durations)
+        return ordered[min(int(len(ordered) * ratio), len(ordered) - 1)] if ordered else 0.0
+
+    def histogram(self) -> Dict[str, int]:
+        buckets = dict.fromkeys([f"<={bound}ms" for bound in PROFILE_BUCKETS_MS] + ['inf'], 0)
+        for duration in self.durations:
+            bound = next((bound for bound in PROFILE_BUCKETS_MS if duration * 1000 <= bound), None)
+            buckets[f"<={bound}ms" if bound else 'inf'] += 1
+        return buckets
+
+
+# Returned by Profiler.measure() when profiling is disabled
+NO_MEASURE = nullcontext()
+
+
+class _Measure:
+    __slots__ = ('profiler', 'stage', 'items', 'started')
+
+    def __init__(self, profiler: 'Profiler', stage: str, items: int):
+        self.profiler, self.stage, self.items = profiler, stage, items
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        self.profiler.record(self.stage, time.perf_counter() - self.started, self.items)
+
+
+class Profiler:
+    """Time spent in every stage of a scan cycle (requests, JSON decoding, analysis, ranking, rendering).
+
+    Disabled unless --profile is given, measure() then only costs an attribute check.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.stages: Dict[str, StageStats] = {}
+
+    def start_cycle(self):
+        self.stages = {}
+
+    def measure(self, stage: str, items: int = 1):
+        return _Measure(self, stage, items) if self.enabled else NO_MEASURE
+
+    def record(self, stage: str, duration: float, items: int = 1):
+        stats = self.stages.setdefault(stage, StageStats())
+        stats.items += items
+        stats.durations.append(duration)
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            stage: {
+                'calls': len(stats.durations),
+                'items': stats.items,
+                'total_ms': round(sum(stats.durations) * 1000, 3),
+                'p50_ms': round(stats.percentile(0.5) * 1000, 3),
+                'p95_ms': round(stats.percentile(0.95) * 1000, 3),
+                'max_ms': round(max(stats.durations) * 1000, 3),
+                'histogram': stats.histogram()
+            }
+            for stage, stats in self.stages.items()
+        }
+
+    def create_table(self) -> Table:
+        table = Table(title="Profile of the last update (ms)")
+        table.add_column("Stage", style="cyan", no_wrap=True)
+        for column in ("Items", "Total", "Per item", "p95", "Max"):
+            table.add_column(column, justify="right", no_wrap=True)
+        for stage, stats in self.report().items():
+            # Stages can run without items, e.g. the analysis when no candles were downloaded
+            per_item = f"{stats['total_ms'] / stats['items']:.3f}" if stats['items'] else '-'
+            table.add_row(stage, str(stats['items']), f"{stats['total_ms']:.1f}",
+                          per_item, f"{stats['p95_ms']:.1f}", f"{stats['max_ms']:.1f}")
+        return table
+
+    def export(self, path: str):
+        with open(path, 'w') as file:
+            json.dump(self.report(), file, indent=2)
+
+
+PROFILER = Profiler()
+
+
+# Upper bounds (in seconds) of the cycle duration histogram
+CYCLE_DURATION_BUCKETS = [0.5, 1, 2.5, 5, 10, 20, 30, 60, 120]
+
+
+class Metrics:
+    """Counters, gauges and histograms rendered in the Prometheus text format for --metrics-port.
+
+    Per-request metrics are only collected when enabled (with --metrics-port).
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.families: Dict[str, Tuple[str, str]] = {}
+        self.samples: Dict[str, Dict[Tuple[Tuple[str, str], ...], float]] = {}
+        self.buckets: Dict[str, List[float]] = {}
+
+    def describe(self, name: str, metric_type: str, help_text: str, buckets: Optional[List[float]] = None):
+        self.families[name] = (metric_type, help_text)
+        if metric_type == 'histogram':
+            self.buckets[name] = buckets
+            self.samples[f"{name}_bucket"] = {(('le', str(bound)),): 0 for bound in buckets + ['+Inf']}
+            self.samples[f"{name}_sum"] = {(): 0}
+            self.samples[f"{name}_count"] = {(): 0}
+        else:
+            self.samples[name] = {}
+
+    def inc(self, name: str, value: float = 1, **labels: str):
+        key = tuple(sorted(labels.items()))
+        self.samples[name][key] = self.samples[name].get(key, 0) + value
+
+    def set(self, name: str, value: float, **labels: str):
+        self.samples[name][tuple(sorted(labels.items()))] = value
+
+    def observe(self, name: str, value: float):
+        # Cumulative buckets like Prometheus expects them
+        for bound in self.buckets[name]:
+            if value <= bound:
+                self.inc(f"{name}_bucket", le=str(bound))
+        self.inc(f"{name}_bucket", le='+Inf')
+        self.inc(f"{name}_sum", value)
+        self.inc(f"{name}_count")
+
+    def render(self) -> str:
+        lines = []
+        for name, (metric_type, help_text) in self.families.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            sample_names = [f"{name}_bucket", f"{name}_sum", f"{name}_count"] if metric_type == 'histogram' else [name]
+            for sample_name in sample_names:
+                for labels, value in self.samples[sample_name].items():
+                    label_text = ','.join(f'{key}="{value}"' for key, value in labels)
+                    lines.append(f"{sample_name}{{{label_text}}} {value}" if label_text else f"{sample_name} {value}")
+        return '\n'.join(lines) + '\n'
+
+
+METRICS = Metrics()
+METRICS.describe('hotcold_cycles_total', 'counter', 'Finished scan cycles')
+METRICS.describe('hotcold_cycle_duration_seconds', 'histogram', 'Duration of scan cycles', CYCLE_DURATION_BUCKETS)
+METRICS.describe('hotcold_symbols_analyzed', 'gauge', 'Symbols analyzed in the last cycle')
+METRICS.describe('hotcold_symbols_failed_total', 'counter', 'Symbols dropped because their candles could not be downloaded')
+METRICS.describe('hotcold_symbols_missed_total', 'counter', 'Symbols left out of cycles because they were not downloaded by the deadline')
+METRICS.describe('hotcold_symbols_by_category', 'gauge', 'Boosters, losers and neutral symbols of the last cycle')
+METRICS.describe('hotcold_requests_total', 'counter', 'Requests to Binance by endpoint and HTTP status')
+METRICS.describe('hotcold_request_weight_total', 'counter', 'Request weight sent to Binance')
+METRICS.describe('hotcold_request_retries_total', 'counter', 'Retried requests by endpoint')
+METRICS.describe('hotcold_request_failures_total', 'counter', 'Requests that failed after all retries by endpoint')
+METRICS.describe('hotcold_used_weight', 'gauge', 'Used request weight per minute last reported by Binance')
+METRICS.describe('hotcold_limiter_waiting', 'gauge', 'Requests waiting for the rate limiter')
+METRICS.describe('hotcold_limiter_active', 'gauge', 'Requests in flight')
+METRICS.describe('hotcold_limiter_concurrency', 'gauge', 'Current concurrency limit of the rate limiter')
+METRICS.describe('hotcold_limiter_tokens', 'gauge', 'Request weight left in the rate limiter bucket')
+
+
+async def handle_metrics(request: web.Request) -> web.Response:
+    # Limiter state is read at scrape time
+    limiter = get_limiter()
+    METRICS.set('hotcold_limiter_waiting', limiter.waiting)
+    METRICS.set('hotcold_limiter_active', limiter.active)
+    METRICS.set('hotcold_limiter_concurrency', int(limiter.concurrency))
+    METRICS.set('hotcold_limiter_tokens', round(limiter.tokens, 1))
+    return web.Response(text=METRICS.render(), content_type='text/plain', charset='utf-8')
+
+
+async def start_metrics_server(host: str, port: int) -> web.AppRunner:
+    app = web.Application()
+    app.router.add_get('/metrics', handle_metrics)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
+
+
+# Returned instead of data when a conditional request finds the resource unchanged (HTTP 304)
+NOT_MODIFIED = object()
+
+
+def create_session(keepalive_timeout: float = KEEPALIVE_TIMEOUT) -> aiohttp.ClientSession:
+    """Session with a connection pool sized for the limiter, so warm connections are reused between cycles.
+
+    Concurrency is already limited by the WeightLimiter, the pool only has to be large enough for its maximum.
+    With --profile new and reused connections and DNS lookups are recorded too.
+    """
+    connector = aiohttp.TCPConnector(
+        limit=MAX_CONCURRENCY,
+        limit_per_host=MAX_CONCURRENCY,
+        ttl_dns_cache=DNS_CACHE_TTL,
+        keepalive_timeout=keepalive_timeout,
+        ssl=False
+    )
+    trace_configs = [create_connection_trace()] if PROFILER.enabled else []
+    return aiohttp.ClientSession(connector=connector, trace_configs=trace_configs)
+
+
+def create_connection_trace() -> aiohttp.TraceConfig:
+    trace_config = aiohttp.TraceConfig()
+
+    async def on_connection_create_start(session, context, params):
+        context.connect_started = time.perf_counter()
+
+    async def on_connection_create_end(session, context, params):
+        PROFILER.record('connection new', time.perf_counter() - context.connect_started)
+
+    async def on_connection_reuseconn(session, context, params):
+        PROFILER.record('connection reused', 0.0)
+
+    async def on_dns_resolvehost_start(session, context, params):
+        context.resolve_started = time.perf_counter()
+
+    async def on_dns_resolvehost_end(session, context, params):
+        PROFILER.record('dns resolve', time.perf_counter() - context.resolve_started)
+
+    trace_config.on_connection_create_start.append(on_connection_create_start)
+    trace_config.on_connection_create_end.append(on_connection_create_end)
+    trace_config.on_connection_reuseconn.append(on_connection_reuseconn)
+    trace_config.on_dns_resolvehost_start.append(on_dns_resolvehost_start)
+    trace_config.on_dns_resolvehost_end.append(on_dns_resolvehost_end)
+    return trace_config
+
+
+async def request_json(
+        session: aiohttp.ClientSession,
+        url: str,
+        path: str,
+        params: Dict[str, Any],
+        weight: int,
+        headers: Optional[Dict[str, str]] = None,
+        decoder: Optional[Callable[[bytes], Any]] = None
+) -> Tuple[Any, Dict[str, str]]:
+    with PROFILER.measure('limiter wait'):
+        limiter = get_limiter()
+        await limiter.acquire(weight)
+    status, response_headers = 0, {}
     try:
-        async with SEMAPHORE:
-            async with session.get(url, params=params, ssl=False, timeout=10) as response:
+        with PROFILER.measure(f"request {path}") if PROFILER.enabled else NO_MEASURE:
+            async with session.get(url, params=params, headers=headers, timeout=REQUEST_TIMEOUT) as response:
+                status, response_headers = response.status, dict(response.headers)
+                if response.status == 304:
+                    return NOT_MODIFIED, response_headers
                 if response.status != 200:
-                    return None
-                return await response.json()
-    except Exception:
+                    # Too many requests and server errors are temporary, other client errors are not
+                    raise RequestError(f"HTTP {response.status}", response.status == 429 or response.status >= 500)
+                body = await response.read()
+        with PROFILER.measure('json decode'):
+            return (decoder or decode_json)(body), response_headers
+    except (aiohttp.ClientConnectionError, aiohttp.ClientPayloadError, asyncio.TimeoutError) as e:
+        raise RequestError(str(e) or type(e).__name__, True) from e
+    finally:
+        if METRICS.enabled:
+            METRICS.inc('hotcold_requests_total', endpoint=path, status=str(status))
+            METRICS.inc('hotcold_request_weight_total', weight)
+            if 'X-MBX-USED-WEIGHT-1M' in response_headers:
+                METRICS.set('hotcold_used_weight', int(response_headers['X-MBX-USED-WEIGHT-1M']))
+        await limiter.release(status, response_headers)
+
+
+async def fetch_json(session: aiohttp.ClientSession, url: str, params: Dict[str, Any], weight: int = 1,
+                     decoder: Optional[Callable[[bytes], Any]] = None) -> Any:
+    response = await fetch_response(session, url, params, weight, decoder=decoder)
+    return response[0] if response else None
+
+
+async def fetch_response(
+        session: aiohttp.ClientSession,
+        url: str,
+        params: Dict[str, Any],
+        weight: int = 1,
+        headers: Optional[Dict[str, str]] = None,
+        decoder: Optional[Callable[[bytes], Any]] = None
+) -> Optional[Tuple[Any, Dict[str, str]]]:
+    path = urlparse(url).path
+    request_stats = current_request_stats()
+    stats = request_stats.endpoint(path)
+    for attempt in range(MAX_RETRIES + 1):
+        if attempt:
+            # Exponential backoff with full jitter, so retries of a failed burst don't come in a burst again
+            delay = random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt))
+            if not request_stats.can_retry(delay):
+                break
+            stats.retries += 1
+            if METRICS.enabled:
+                METRICS.inc('hotcold_request_retries_total', endpoint=path)
+            await asyncio.sleep(delay)
+
+        started = time.monotonic()
+        try:
+            return await request_json(session, url, path, params, weight, headers, decoder)
+        except RequestError as e:
+            if not e.retryable:
+                break
+        except Exception:
+            break
+        finally:
+            latency = time.monotonic() - started
+            stats.requests += 1
+            stats.total_latency += latency
+            stats.max_latency = max(stats.max_latency, latency)
+
+    stats.failures += 1
+    if METRICS.enabled:
+        METRICS.inc('hotcold_request_failures_total', endpoint=path)
+    return None
+
+
+class KlineStore:
+    """SQLite store of closed klines, so candles downloaded by previous runs are not downloaded again.
+
+    The same store may be used by several processes at once (--workers, overlapping cron runs or
+    a --watch process next to them), so every write is committed right away and readers don't wait
+    for writers. A failing store only means candles are downloaded instead of loaded.
+    """
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.connection = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.intervals: Set[str] = set()
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS klines (
+                symbol TEXT NOT NULL,
+                interval TEXT NOT NULL,
+                open_time INTEGER NOT NULL,
+                open REAL NOT NULL,
+                high REAL NOT NULL,
+                low REAL NOT NULL,
+                close REAL NOT NULL,
+                volume REAL NOT NULL,
+                close_time INTEGER NOT NULL,
+                PRIMARY KEY (symbol, interval, open_time)
+            ) WITHOUT ROWID
+        """)
+
+    def load(self, symbol: str, interval: str, limit: int) -> Klines:
+        try:
+            rows = self.connection.execute(
+                "SELECT open_time, open, high, low, close, volume FROM klines "
+                "WHERE symbol = ? AND interval = ? ORDER BY open_time DESC LIMIT ?",
+                (symbol, interval, limit)
+            ).fetchall()
+        except sqlite3.Error:
+            return Klines()
+        return Klines.from_rows(rows[::-1])
+
+    def save(self, symbol: str, interval: str, candles: Klines):
+        # Only closed candles are stored, the last one is usually still changing
+        interval_ms = parse_timeframe(interval) * 60_000
+        now = int(time.time() * 1000)
+        self.intervals.add(interval)
+        try:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO klines VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [(symbol, interval, *candle, candle[0] + interval_ms - 1)
+                 for candle in zip(*candles.columns()) if candle[0] + interval_ms <= now]
+            )
+        except sqlite3.Error:
+            pass
+
+    def prune(self):
+        # Pruned per interval, so long windows of coarse candles are still found complete on the next start
+        now = int(time.time() * 1000)
+        for interval in self.intervals:
+            retention_ms = max(KLINE_STORE_RETENTION_DAYS * 86_400_000,
+                               KLINES_MAX_LIMIT * parse_timeframe(interval) * 60_000)
+            try:
+                self.connection.execute("DELETE FROM klines WHERE interval = ? AND open_time < ?",
+                                        (interval, now - retention_ms))
+            except sqlite3.Error:
+                pass
+
+    def close(self):
+        self.prune()
+        self.connection.close()
+
+
+class KlineCache:
+    """In-memory ring buffer of klines per (symbol, interval).
+
+    The first request for a key downloads the full window (or only its tail if the rest is in the
+    on-disk store), later requests only download candles starting from the last known one
+    (which may still have been open) and append them.
+    """
+
+    def __init__(self, store: Optional[KlineStore] = None):
+        self.buffers: Dict[Tuple[str, str], Klines] = {}
+        self.store = store
+
+    async def get(self, session: aiohttp.ClientSession, symbol: str, interval: str, limit: int) -> Optional[Klines]:
+        key = (symbol, interval)
+        buffer = self.buffers.get(key)
+        if buffer is None or buffer.maxlen < limit:
+            buffer = self._load(key, limit)
+            if buffer is None:
+                return await self._seed(session, key, limit)
+
+        # Number of candles opened since the last one we know about (including it)
+        interval_ms = parse_timeframe(interval) * 60_000
+        last_open_time = buffer.open_time[-1]
+        missing = (int(time.time() * 1000) - last_open_time) // interval_ms + 2
+        if missing >= buffer.maxlen:
+            return await self._seed(session, key, buffer.maxlen, limit)
+
+        candles = await fetch_json(session, KLINES_URL, {
+            'symbol': symbol,
+            'interval': interval,
+            'startTime': last_open_time,
+            'limit': missing
+        }, kline_weight(missing), Klines.from_json)
+        if not candles:
+            return None
+        # A full page means there may be even more candles we haven't seen, start over
+        if len(candles) >= missing:
+            return await self._seed(session, key, buffer.maxlen, limit)
+
+        buffer.merge(candles)
+        if self.store:
+            self.store.save(symbol, interval, candles)
+        return buffer[-limit:]
+
+    def peek(self, symbol: str, interval: str, limit: int) -> Optional[Klines]:
+        # Return the cached window without touching the network
+        buffer = self.buffers.get((symbol, interval))
+        if not buffer:
+            return None
+        return buffer[-limit:]
+
+    def update(self, symbol: str, interval: str, candle: List[Any]) -> bool:
+        # Put a single (possibly still open) candle into an already seeded buffer
+        buffer = self.buffers.get((symbol, interval))
+        if not buffer:
+            return False
+        return buffer.merge(Klines.from_rows([candle]))
+
+    def _load(self, key: Tuple[str, str], size: int) -> Optional[Klines]:
+        # Start from stored candles if they reach back to the beginning of the window
+        if not self.store:
+            return None
+        candles = self.store.load(*key, size)
+        if not candles:
+            return None
+        interval_ms = parse_timeframe(key[1]) * 60_000
+        open_times = candles.open_time
+        for i in range(len(open_times) - 1, 0, -1):
+            if open_times[i] - open_times[i - 1] != interval_ms:
+                candles = candles[i:]
+                break
+        window_start = int(time.time() * 1000) // interval_ms * interval_ms - (size - 1) * interval_ms
+        if candles.open_time[0] > window_start:
+            return None
+        candles.maxlen = size
+        self.buffers[key] = candles
+        return candles
+
+    async def _seed(self, session: aiohttp.ClientSession, key: Tuple[str, str], size: int,
+                    limit: Optional[int] = None) -> Optional[Klines]:
+        symbol, interval = key
+        buffer = await fetch_json(session, KLINES_URL, {
+            'symbol': symbol,
+            'interval': interval,
+            'limit': size
+        }, kline_weight(size), Klines.from_json)
+        if not buffer:
+            self.buffers.pop(key, None)
+            return None
+        buffer.maxlen = size
+        buffer._trim()
+        self.buffers[key] = buffer
+        if self.store:
+            self.store.save(symbol, interval, buffer)
+        return buffer[-(limit or size):]
+
+
+async def fetch_windows(
+        session: aiohttp.ClientSession,
+        cache: KlineCache,
+        symbol: str,
+        windows: List[Tuple[str, int]]
+) -> Optional[List[Klines]]:
+    # Download every planned interval once (all at the same time, so a symbol costs one round trip)
+    # and cut the requested windows out of it
+    plan = plan_kline_requests(windows)
+    downloaded = await asyncio.gather(*(cache.get(session, symbol, interval, limit)
+                                        for interval, limit in plan.items()))
+    if not all(downloaded):
         return None
+    return derive_windows(dict(zip(plan, downloaded)), plan, windows)
 
 
-async def get_usdt_symbols(session: aiohttp.ClientSession) -> List[str]:
-    data = await fetch_json(session, EXCHANGE_INFO_URL, {})
-    if data is None:
-        return []
-    symbols = [s['symbol'] for s in data['symbols'] if s['quoteAsset'] == 'USDT' and s['status'] == 'TRADING']
-    return symbols
+def peek_windows(cache: KlineCache, symbol: str, windows: List[Tuple[str, int]]) -> Optional[List[Klines]]:
+    # Same as fetch_windows, but only from what is already cached
+    plan = plan_kline_requests(windows)
+    fetched: Dict[str, Klines] = {}
+    for interval, limit in plan.items():
+        data = cache.peek(symbol, interval, limit)
+        if not data:
+            return None
+        fetched[interval] = data
+    return derive_windows(fetched, plan, windows)
+
 
+def derive_windows(fetched: Dict[str, Klines], plan: Dict[str, int],
+                   windows: List[Tuple[str, int]]) -> List[Klines]:
+    result = []
+    for interval, limit in windows:
+        if interval in fetched:
+            result.append(fetched[interval][-limit:])
+        else:
+            source = next(fine for fine in plan
+                          if parse_timeframe(interval) % parse_timeframe(fine) == 0
+                          and plan[fine] >= limit * parse_timeframe(interval) // parse_timeframe(fine))
+            result.append(resample_klines(fetched[source], interval, limit))
+    return result
+
+
+def filter_usdt_symbols(data: Dict[str, Any]) -> List[str]:
+    return [s['symbol'] for s in data['symbols'] if s['quoteAsset'] == 'USDT' and s['status'] == 'TRADING']
+
+
+async def prefilter_symbols(session: aiohttp.ClientSession, symbols: List[str], count: int) -> List[str]:
+    """Pick `count` symbols worth a full analysis from a single 24hr ticker request.
+
+    Half of them are the ones that rose the most above their 24h low (booster candidates), the other
+    half fell the most below their 24h high (loser candidates). All symbols are returned if the ticker
+    is not available.
+    """
+    data = await fetch_json(session, TICKER_24HR_URL, {}, TICKER_24HR_WEIGHT)
+    if not data:
+        return symbols
+
+    known = set(symbols)
+    rises, falls = {}, {}
+    for ticker in data:
+        symbol = ticker['symbol']
+        if symbol not in known:
+            continue
+        last_price, high_price, low_price = (float(ticker[key]) for key in ('lastPrice', 'highPrice', 'lowPrice'))
+        if not (high_price and low_price):
+            continue
+        rises[symbol] = (last_price - low_price) / low_price
+        falls[symbol] = (high_price - last_price) / high_price
+
+    picked = heapq.nlargest(count - count // 2, rises, key=rises.get) + heapq.nlargest(count // 2, falls, key=falls.get)
+    picked = list(dict.fromkeys(picked))
+    # Fill up with the next best candidates if both halves picked the same symbols
+    for symbol in sorted(rises, key=lambda symbol: max(rises[symbol], falls[symbol]), reverse=True):
+        if len(picked) >= count:
+            break
+        if symbol not in picked:
+            picked.append(symbol)
+    return picked
+
+
+class PriceHistory:
+    """Rolling history of prices of all symbols, made of one bulk price ticker snapshot per refresh.
+
+    Once the history covers the whole current interval, the simple mode analyzes the snapshots
+    instead of downloading klines for every symbol.
+    """
+
+    def __init__(self, interval: str):
+        self.duration_ms = parse_timeframe(interval) * 60_000
+        self.snapshots: Deque[Tuple[int, Dict[str, float]]] = deque()
+
+    async def update(self, session: aiohttp.ClientSession) -> bool:
+        data = await fetch_json(session, TICKER_PRICE_URL, {}, TICKER_PRICE_WEIGHT)
+        if not data:
+            return False
+        now = int(time.time() * 1000)
+        self.snapshots.append((now, {ticker['symbol']: float(ticker['price']) for ticker in data}))
+        # Keep one snapshot from before the interval, so the history always covers all of it
+        while len(self.snapshots) > 1 and self.snapshots[1][0] <= now - self.duration_ms:
+            self.snapshots.popleft()
+        return True
+
+    def is_warm(self) -> bool:
+        return len(self.snapshots) > 1 and self.snapshots[0][0] <= self.snapshots[-1][0] - self.duration_ms
+
+    def klines(self, symbol: str) -> Klines:
+        # Every snapshot becomes a candle with the same open, high, low and close
+        klines = Klines()
+        for timestamp, prices in self.snapshots:
+            price = prices.get(symbol)
+            if price is not None:
+                klines.append(timestamp, price, price, price, price, 0.0)
+        return klines
+
+
+class SymbolCache:
+    """USDT symbols from exchangeInfo, cached (on disk when a path is given) for EXCHANGE_INFO_TTL seconds.
+
+    Expired entries are revalidated with ETag/Last-Modified when Binance sent them, and the last known
+    symbols are kept if the refresh fails.
+    """
+
+    def __init__(self, path: Optional[str] = None, ttl: float = EXCHANGE_INFO_TTL):
+        self.path = path
+        self.ttl = ttl
+        self.entry: Dict[str, Any] = self._read() or {}
+
+    @property
+    def symbols(self) -> List[str]:
+        return self.entry.get('symbols', [])
+
+    def is_fresh(self) -> bool:
+        return bool(self.entry) and time.time() - self.entry['fetched_at'] < self.ttl
+
+    async def get(self, session: aiohttp.ClientSession) -> List[str]:
+        if not self.is_fresh():
+            await self.refresh(session)
+        return self.symbols
+
+    async def refresh(self, session: aiohttp.ClientSession) -> bool:
+        headers = {}
+        if self.entry.get('etag'):
+            headers['If-None-Match'] = self.entry['etag']
+        if self.entry.get('last_modified'):
+            headers['If-Modified-Since'] = self.entry['last_modified']
+
+        response = await fetch_response(session, EXCHANGE_INFO_URL, {}, headers=headers)
+        if response is None:
+            return False
+        data, response_headers = response
+        if data is NOT_MODIFIED:
+            self.entry['fetched_at'] = time.time()
+        else:
+            self.entry = {
+                'symbols': filter_usdt_symbols(data),
+                'fetched_at': time.time(),
+                'etag': response_headers.get('ETag'),
+                'last_modified': response_headers.get('Last-Modified')
+            }
+        self._write()
+        return True
+
+    async def refresh_periodically(self, session: aiohttp.ClientSession):
+        # Runs in the background during watch mode, so new listings and delistings are picked up.
+        # Its requests aren't counted in the scan cycles, and failed refreshes are retried less and less often
+        _request_stats.set(RequestStats())
+        retry_delay = 0.0
+        while True:
+            await asyncio.sleep(retry_delay or max(self.ttl - (time.time() - self.entry.get('fetched_at', 0)), 1))
+            if await self.refresh(session):
+                retry_delay = 0.0
+            else:
+                retry_delay = min(retry_delay * 2 or EXCHANGE_INFO_RETRY_DELAY, self.ttl)
+
+    def _read(self) -> Optional[Dict[str, Any]]:
+        if not self.path or not os.path.exists(self.path):
+            return None
+        try:
+            with open(self.path) as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return None
 
-def calculate_avg_max(candles: KlineData, ratio_to_pick: float) -> float:
-    top_x = max(int(len(candles) * ratio_to_pick), 1)
-    max_values = [float(candle[2]) for candle in candles]
-    top_max = sorted(max_values, reverse=True)[:top_x]
-    return sum(top_max) / len(top_max) if top_max else 0.0
+    def _write(self):
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        # Write to a temporary file first, so a concurrently started run never reads half of it
+        temporary_path = f"{self.path}.tmp"
+        with open(temporary_path, 'w') as file:
+            json.dump(self.entry, file)
+        os.replace(temporary_path, self.path)
+
+
+def average_top(values: array, count: int) -> float:
+    # Average of the `count` largest values without sorting all of them when possible
+    if not values:
+        return 0.0
+    if numpy is not None:
+        top = numpy.partition(numpy.frombuffer(values, dtype=numpy.float64), len(values) - count)[len(values) - count:]
+        return float(top.mean())
+    # A heap only beats the C sort when a small part of the values is picked
+    top = heapq.nlargest(count, values) if count * HEAP_SELECTION_RATIO < len(values) \
+        else sorted(values, reverse=True)[:count]
+    return sum(top) / len(top)
+
+
+def average_bottom(values: array, count: int) -> float:
+    # Average of the `count` smallest values, see average_top
+    if not values:
+        return 0.0
+    if numpy is not None:
+        return float(numpy.partition(numpy.frombuffer(values, dtype=numpy.float64), count - 1)[:count].mean())
+    bottom = heapq.nsmallest(count, values) if count * HEAP_SELECTION_RATIO < len(values) \
+        else sorted(values)[:count]
+    return sum(bottom) / len(bottom)
 
 
 def trimmed_median(prices, trim_percent=5):
@@ -104,185 +1200,340 @@ def trimmed_median(prices, trim_percent=5):
     return median(sorted(prices)[trim_count: -trim_count or None])
 
 
-def calculate_avg_min(candles: KlineData, ration_to_pick: float) -> float:
-    bottom_x = max(int(len(candles) * ration_to_pick), 1)
-    min_values = [float(candle[3]) for candle in candles]
-    bottom_min = sorted(min_values)[:bottom_x]
-    return sum(bottom_min) / len(bottom_min) if bottom_min else 0.0
+def calculate_avg_extremes(candles: Klines, ratio_to_pick: float) -> Tuple[float, float]:
+    # Average of the top highs and of the bottom lows of the same candles
+    picked = max(int(len(candles) * ratio_to_pick), 1)
+    return average_top(candles.high, picked), average_bottom(candles.low, picked)
 
 
-async def analyze_symbol_simple(
-        session: aiohttp.ClientSession,
-        symbol: str,
-        args: argparse.Namespace
-) -> Optional[SymbolAnalysisResult]:
-    try:
+def get_analysis_windows(args: argparse.Namespace) -> List[Tuple[str, int]]:
+    # Candle interval and number of candles of every window the analysis looks at (big, short, current)
+    intervals = [args.current_interval] if args.simple \
+        else [args.big_interval, args.short_interval, args.current_interval]
+    windows = []
+    for interval in intervals:
+        small_interval = get_small_interval(interval)
+        windows.append((small_interval, calculate_required_candles(interval, small_interval)))
+    return windows
 
-        # Get Current interval data
-        current_interval = args.current_interval
-        current_small_interval = get_small_interval(current_interval)
-        current_limit = calculate_required_candles(current_interval, current_small_interval)
-        current_data = await fetch_json(session, KLINES_URL, {
-            'symbol': symbol,
-            'interval': current_small_interval,
-            'limit': current_limit
-        })
-        # Get last candle data
-        current_data_last = current_data[-1]
-        # Get all previous candles
-        current_data = current_data[:-1]
-        # Get current price from close price of last candle
-        current_price = float(current_data_last[4])
-
-        # Calculate averages of max and min if we have enough data
-        if len(current_data) >= 10:
-            current_max = calculate_avg_max(current_data, 0.2)
-            current_min = calculate_avg_min(current_data, 0.2)
-        else:
-            current_max = max(float(candle[2]) for candle in current_data)
-            current_min = min(float(candle[3]) for candle in current_data)
-
-        is_current_price_satisfied_by_max = current_price > current_max
-        is_current_price_satisfied_by_min = current_price < current_min
-
-        # Determine Booster
-        if is_current_price_satisfied_by_max:
-            category = "booster"
-            change_percent = ((current_price - current_max) / current_max) * 100
-            price = current_price
-        # Determine Loser
-        elif is_current_price_satisfied_by_min:
-            category = "loser"
-            change_percent = ((current_price - current_min) / current_min) * 100
-            price = current_price
-        else:
-            category = "neutral"
-            change_percent_up = ((current_price - current_max) / current_max) * 100
-            change_percent = change_percent_up
-            price = current_price
 
+def make_profile(args: argparse.Namespace, intervals: List[str]) -> argparse.Namespace:
+    # Copy of the options for another set of intervals, a single interval means the simple mode
+    profile = argparse.Namespace(**vars(args))
+    profile.current_interval = intervals[0]
+    profile.simple = len(intervals) == 1
+    if not profile.simple:
+        profile.short_interval, profile.big_interval = intervals[1:]
+    return profile
 
-        return SymbolAnalysisResult(
-            category=category,
-            symbol=symbol,
-            change_percent=change_percent,
-            change_percent_big_interval=0.0,
-            price=price,
-            marks=[]
-        )
 
-    except Exception:
-        return None
+def profile_label(args: argparse.Namespace) -> str:
+    return args.current_interval if args.simple \
+        else ','.join((args.current_interval, args.short_interval, args.big_interval))
 
 
-async def analyze_symbol(
-        session: aiohttp.ClientSession,
+def get_profile_windows(profiles: List[argparse.Namespace]) -> Tuple[List[Tuple[str, int]], List[List[int]]]:
+    # Windows needed by all profiles together, and the positions of every profile's own windows among them
+    windows: List[Tuple[str, int]] = []
+    positions = []
+    for profile in profiles:
+        indices = []
+        for window in get_analysis_windows(profile):
+            if window not in windows:
+                windows.append(window)
+            indices.append(windows.index(window))
+        positions.append(indices)
+    return windows, positions
+
+
+def evaluate_symbol_simple(
         symbol: str,
+        current_data: Klines,
         args: argparse.Namespace
 ) -> Optional[SymbolAnalysisResult]:
-    try:
-        # Determine small intervals and required candles
-        big_interval = args.big_interval
-        short_interval = args.short_interval
-        current_interval = args.current_interval
+    # Get current price from close price of last candle
+    current_price = current_data.close[-1]
+    # Get all previous candles
+    current_data = current_data[:-1]
+
+    # Calculate averages of max and min if we have enough data
+    if len(current_data) >= 10:
+        current_max, current_min = calculate_avg_extremes(current_data, 0.2)
+    else:
+        current_max = max(current_data.high)
+        current_min = min(current_data.low)
+
+    is_current_price_satisfied_by_max = current_price > current_max
+    is_current_price_satisfied_by_min = current_price < current_min
+
+    # Determine Booster
+    if is_current_price_satisfied_by_max:
+        category = "booster"
+        change_percent = ((current_price - current_max) / current_max) * 100
+        price = current_price
+    # Determine Loser
+    elif is_current_price_satisfied_by_min:
+        category = "loser"
+        change_percent = ((current_price - current_min) / current_min) * 100
+        price = current_price
+    else:
+        category = "neutral"
+        change_percent_up = ((current_price - current_max) / current_max) * 100
+        change_percent = change_percent_up
+        price = current_price
 
-        big_small_interval = get_small_interval(big_interval)
-        short_small_interval = get_small_interval(short_interval)
-        current_small_interval = get_small_interval(current_interval)
 
-        big_limit = calculate_required_candles(big_interval, big_small_interval)
-        short_limit = calculate_required_candles(short_interval, short_small_interval)
-        current_limit = calculate_required_candles(current_interval, current_small_interval)
+    return SymbolAnalysisResult(
+        category=category,
+        symbol=symbol,
+        change_percent=change_percent,
+        change_percent_big_interval=0.0,
+        price=price,
+        marks=[]
+    )
 
-        # Fetch candlestick data
-        big_data = await fetch_json(session, KLINES_URL, {
-            'symbol': symbol,
-            'interval': big_small_interval,
-            'limit': big_limit
-        })
-        short_data = await fetch_json(session, KLINES_URL, {
-            'symbol': symbol,
-            'interval': short_small_interval,
-            'limit': short_limit
-        })
-        current_data = await fetch_json(session, KLINES_URL, {
-            'symbol': symbol,
-            'interval': current_small_interval,
-            'limit': current_limit
-        })
 
-        if not (big_data and short_data and current_data):
+def evaluate_symbol(
+        symbol: str,
+        big_data: Klines,
+        short_data: Klines,
+        current_data: Klines,
+        args: argparse.Namespace
+) -> Optional[SymbolAnalysisResult]:
+    if not (big_data and short_data and current_data):
+        return None
+
+    # Calculate averages
+    big_max_avg, big_min_avg = calculate_avg_extremes(big_data, args.big_avg_ratio)
+    short_max_avg, short_min_avg = calculate_avg_extremes(short_data, args.short_avg_ratio)
+    current_max = max(current_data.high)
+    current_min = min(current_data.low)
+
+    # No spikes check
+    if args.no_spikes:
+        big_median = trimmed_median(big_data.close)
+        short_close_avg = fmean(short_data.close)
+        # Check short data close prices average is not threshold % away from median
+        is_valid = abs((short_close_avg - big_median) / big_median) < args.spike_threshold / 100
+        # Ignore this symbol
+        if not is_valid:
             return None
 
-        # Calculate averages
-        big_max_avg = calculate_avg_max(big_data, args.big_avg_ratio)
-        short_max_avg = calculate_avg_max(short_data, args.short_avg_ratio)
-        current_max = max(float(candle[2]) for candle in current_data)
-
-        big_min_avg = calculate_avg_min(big_data, args.big_avg_ratio)
-        short_min_avg = calculate_avg_min(short_data, args.short_avg_ratio)
-        current_min = min(float(candle[3]) for candle in current_data)
-
-        # No spikes check
-        if args.no_spikes:
-            big_median = trimmed_median([float(candle[4]) for candle in big_data])
-            short_close_avg = mean([float(candle[4]) for candle in short_data])
-            # Check short data close prices average is not threshold % away from median
-            is_valid = abs((short_close_avg - big_median) / big_median) < args.spike_threshold / 100
-            # Ignore this symbol
-            if not is_valid:
-                return None
-
-        # Determine Booster
-
-        # Intervals defined by max values
-        is_big_interval_satisfied_by_max = current_max > big_max_avg
-        is_short_interval_satisfied_by_max = current_max > short_max_avg
-
-        # Intervals defined by min values
-        is_big_interval_satisfied_by_min = current_min < big_min_avg
-        is_short_interval_satisfied_by_min = current_min < short_min_avg
-
-        marks = []
-        marks += ["›"] if is_short_interval_satisfied_by_max or is_short_interval_satisfied_by_min else []
-        marks += ["»"] if is_big_interval_satisfied_by_max or is_big_interval_satisfied_by_min else []
-
-        # Determine Booster
-        if is_short_interval_satisfied_by_max and is_big_interval_satisfied_by_max:
-            category = "booster"
-            change_percent = ((current_max - short_max_avg) / short_max_avg) * 100
+    # Determine Booster
+
+    # Intervals defined by max values
+    is_big_interval_satisfied_by_max = current_max > big_max_avg
+    is_short_interval_satisfied_by_max = current_max > short_max_avg
+
+    # Intervals defined by min values
+    is_big_interval_satisfied_by_min = current_min < big_min_avg
+    is_short_interval_satisfied_by_min = current_min < short_min_avg
+
+    marks = []
+    marks += ["›"] if is_short_interval_satisfied_by_max or is_short_interval_satisfied_by_min else []
+    marks += ["»"] if is_big_interval_satisfied_by_max or is_big_interval_satisfied_by_min else []
+
+    # Determine Booster
+    if is_short_interval_satisfied_by_max and is_big_interval_satisfied_by_max:
+        category = "booster"
+        change_percent = ((current_max - short_max_avg) / short_max_avg) * 100
+        change_percent_big_interval = ((current_max - big_max_avg) / big_max_avg) * 100
+        price = current_max
+    # Determine Loser
+    elif is_short_interval_satisfied_by_min and is_big_interval_satisfied_by_min:
+        category = "loser"
+        change_percent = ((current_min - short_min_avg) / short_min_avg) * 100
+        change_percent_big_interval = ((current_min - big_min_avg) / big_min_avg) * 100
+        price = current_min
+    else:
+        category = "neutral"
+        change_percent_up = ((current_max - short_max_avg) / short_max_avg) * 100
+        change_percent_down = ((current_min - short_min_avg) / short_min_avg) * 100
+        # Determine what's looks better for neutral its gain or loss
+        if abs(change_percent_up) >= abs(change_percent_down):
+            change_percent = change_percent_up
             change_percent_big_interval = ((current_max - big_max_avg) / big_max_avg) * 100
             price = current_max
-        # Determine Loser
-        elif is_short_interval_satisfied_by_min and is_big_interval_satisfied_by_min:
-            category = "loser"
-            change_percent = ((current_min - short_min_avg) / short_min_avg) * 100
+        else:
+            change_percent = change_percent_down
             change_percent_big_interval = ((current_min - big_min_avg) / big_min_avg) * 100
             price = current_min
-        else:
-            category = "neutral"
-            change_percent_up = ((current_max - short_max_avg) / short_max_avg) * 100
-            change_percent_down = ((current_min - short_min_avg) / short_min_avg) * 100
-            # Determine what's looks better for neutral its gain or loss
-            if abs(change_percent_up) >= abs(change_percent_down):
-                change_percent = change_percent_up
-                change_percent_big_interval = ((current_max - big_max_avg) / big_max_avg) * 100
-                price = current_max
+
+    return SymbolAnalysisResult(
+        category=category,
+        symbol=symbol,
+        change_percent=change_percent,
+        change_percent_big_interval=change_percent_big_interval,
+        price=price,
+        marks=marks
+    )
+
+
+def evaluate_windows(symbol: str, data: List[Klines], args: argparse.Namespace) -> Optional[SymbolAnalysisResult]:
+    try:
+        return evaluate_symbol_simple(symbol, data[0], args) if args.simple else evaluate_symbol(symbol, *data, args)
+    except Exception:
+        return None
+
+
+async def fetch_symbol_windows(
+        session: aiohttp.ClientSession,
+        cache: KlineCache,
+        symbol: str,
+        windows: List[Tuple[str, int]]
+) -> Optional[Tuple[str, List[Klines]]]:
+    try:
+        data = await fetch_windows(session, cache, symbol, windows)
+    except Exception:
+        return None
+    return (symbol, data) if data else None
+
+
+def evaluate_batch(batch: List[Tuple[str, List[Klines]]], args: argparse.Namespace) -> List[SymbolAnalysisResult]:
+    """Analyze many symbols at once.
+
+    With numpy installed, windows of the same length are stacked into (symbols x candles) matrices
+    and every step of the analysis is done for all of them in one operation, otherwise symbols are
+    analyzed one by one.
+    """
+    if numpy is None:
+        results = (evaluate_windows(symbol, data, args) for symbol, data in batch)
+        return [result for result in results if result]
+
+    groups: Dict[Tuple[int, ...], List[Tuple[str, List[Klines]]]] = {}
+    for symbol, data in batch:
+        groups.setdefault(tuple(len(window) for window in data), []).append((symbol, data))
+
+    results = []
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        for lengths, group in groups.items():
+            if min(lengths) < 2:
+                # Too few candles for the matrices, the regular analysis handles (or rejects) these
+                results.extend(filter(None, (evaluate_windows(symbol, data, args) for symbol, data in group)))
+            elif args.simple:
+                results.extend(_evaluate_group_simple(group))
             else:
-                change_percent = change_percent_down
-                change_percent_big_interval = ((current_min - big_min_avg) / big_min_avg) * 100
-                price = current_min
+                results.extend(_evaluate_group(group, args))
+    return results
+
+
+def evaluate_profiles(
+        batch: List[Tuple[str, List[Klines]]],
+        profiles: List[argparse.Namespace],
+        positions: List[List[int]]
+) -> List[List[SymbolAnalysisResult]]:
+    # Evaluate every profile on the windows downloaded once for all of them
+    with PROFILER.measure('analysis', len(batch) * len(profiles)):
+        if len(profiles) == 1:
+            return [evaluate_batch(batch, profiles[0])]
+        return [evaluate_batch([(symbol, [data[i] for i in indices]) for symbol, data in batch], profile)
+                for profile, indices in zip(profiles, positions)]
+
+
+def _stack(group: List[Tuple[str, List[Klines]]], window: int, column: str):
+    return numpy.stack([numpy.frombuffer(getattr(data[window], column), dtype=numpy.float64) for _, data in group])
 
-        return SymbolAnalysisResult(
-            category=category,
+
+def _avg_top(values, ratio_to_pick: float):
+    # Row-wise average of the top ratio of values, partition instead of a full sort
+    count = values.shape[1]
+    top_x = max(int(count * ratio_to_pick), 1)
+    return numpy.partition(values, count - top_x, axis=1)[:, count - top_x:].mean(axis=1)
+
+
+def _avg_bottom(values, ratio_to_pick: float):
+    bottom_x = max(int(values.shape[1] * ratio_to_pick), 1)
+    return numpy.partition(values, bottom_x - 1, axis=1)[:, :bottom_x].mean(axis=1)
+
+
+def _evaluate_group_simple(group: List[Tuple[str, List[Klines]]]) -> List[SymbolAnalysisResult]:
+    # Same as evaluate_symbol_simple for a group of symbols with equally long windows
+    current_price = _stack(group, 0, 'close')[:, -1]
+    high = _stack(group, 0, 'high')[:, :-1]
+    low = _stack(group, 0, 'low')[:, :-1]
+    if high.shape[1] >= 10:
+        current_max = _avg_top(high, 0.2)
+        current_min = _avg_bottom(low, 0.2)
+    else:
+        current_max = high.max(axis=1)
+        current_min = low.min(axis=1)
+
+    is_booster = current_price > current_max
+    is_loser = ~is_booster & (current_price < current_min)
+    change_percent = numpy.where(is_loser, (current_price - current_min) / current_min,
+                                 (current_price - current_max) / current_max) * 100
+    is_valid = numpy.isfinite(change_percent)
+
+    return [
+        SymbolAnalysisResult(
+            category="booster" if booster else "loser" if loser else "neutral",
             symbol=symbol,
-            change_percent=change_percent,
-            change_percent_big_interval=change_percent_big_interval,
+            change_percent=change,
+            change_percent_big_interval=0.0,
             price=price,
-            marks=marks
+            marks=[]
         )
-    except Exception:
-        return None
+        for (symbol, _), booster, loser, change, price, valid in zip(
+            group, is_booster.tolist(), is_loser.tolist(), change_percent.tolist(), current_price.tolist(),
+            is_valid.tolist())
+        if valid
+    ]
+
+
+def _evaluate_group(group: List[Tuple[str, List[Klines]]], args: argparse.Namespace) -> List[SymbolAnalysisResult]:
+    # Same as evaluate_symbol for a group of symbols with equally long windows
+    big_max_avg = _avg_top(_stack(group, 0, 'high'), args.big_avg_ratio)
+    short_max_avg = _avg_top(_stack(group, 1, 'high'), args.short_avg_ratio)
+    current_max = _stack(group, 2, 'high').max(axis=1)
+
+    big_min_avg = _avg_bottom(_stack(group, 0, 'low'), args.big_avg_ratio)
+    short_min_avg = _avg_bottom(_stack(group, 1, 'low'), args.short_avg_ratio)
+    current_min = _stack(group, 2, 'low').min(axis=1)
+
+    is_valid = numpy.ones(len(group), dtype=bool)
+    if args.no_spikes:
+        big_close = numpy.sort(_stack(group, 0, 'close'), axis=1)
+        trim_count = int(big_close.shape[1] * 5 / 100)
+        big_median = numpy.median(big_close[:, trim_count: -trim_count or None], axis=1)
+        short_close_avg = _stack(group, 1, 'close').mean(axis=1)
+        is_valid = numpy.abs((short_close_avg - big_median) / big_median) < args.spike_threshold / 100
+
+    is_big_interval_satisfied_by_max = current_max > big_max_avg
+    is_short_interval_satisfied_by_max = current_max > short_max_avg
+    is_big_interval_satisfied_by_min = current_min < big_min_avg
+    is_short_interval_satisfied_by_min = current_min < short_min_avg
+
+    is_booster = is_short_interval_satisfied_by_max & is_big_interval_satisfied_by_max
+    is_loser = ~is_booster & is_short_interval_satisfied_by_min & is_big_interval_satisfied_by_min
+
+    change_percent_up = (current_max - short_max_avg) / short_max_avg * 100
+    change_percent_down = (current_min - short_min_avg) / short_min_avg * 100
+    # Boosters use max values, losers min values, neutrals what looks better: gain or loss
+    use_max = is_booster | (~is_loser & (numpy.abs(change_percent_up) >= numpy.abs(change_percent_down)))
+    change_percent = numpy.where(use_max, change_percent_up, change_percent_down)
+    change_percent_big_interval = numpy.where(use_max, (current_max - big_max_avg) / big_max_avg,
+                                              (current_min - big_min_avg) / big_min_avg) * 100
+    price = numpy.where(use_max, current_max, current_min)
+    is_valid &= numpy.isfinite(change_percent) & numpy.isfinite(change_percent_big_interval)
+
+    short_mark = is_short_interval_satisfied_by_max | is_short_interval_satisfied_by_min
+    big_mark = is_big_interval_satisfied_by_max | is_big_interval_satisfied_by_min
+
+    return [
+        SymbolAnalysisResult(
+            category="booster" if booster else "loser" if loser else "neutral",
+            symbol=symbol,
+            change_percent=change,
+            change_percent_big_interval=change_big,
+            price=price_value,
+            marks=(["›"] if short else []) + (["»"] if big else [])
+        )
+        for (symbol, _), booster, loser, change, change_big, price_value, short, big, valid in zip(
+            group, is_booster.tolist(), is_loser.tolist(), change_percent.tolist(),
+            change_percent_big_interval.tolist(), price.tolist(), short_mark.tolist(), big_mark.tolist(),
+            is_valid.tolist())
+        if valid
+    ]
 
 
 def create_table_simple(results: List[SymbolAnalysisResult], last_updated: str, args: argparse.Namespace) -> Table:
@@ -357,117 +1608,905 @@ def create_table(results: List[SymbolAnalysisResult], last_updated: str, args: a
     return table
 
 
-async def main(args: argparse.Namespace):
-    # Human-readable message
-    if args.simple:
-        console.print(
-            f"\n[bold]Searching where the current price is different on last [yellow]{args.current_interval}[/yellow] interval[/bold]\n")
-    else:
-        console.print(
-        f"\n[bold]Searching where the last [yellow]{args.current_interval}[/yellow] price is different on last [yellow]{args.short_interval}[/yellow] and [yellow]{args.big_interval}[/yellow] intervals[/bold]\n")
-
-    async with aiohttp.ClientSession() as session:
-        # Fetching symbol list
-        symbols = await get_usdt_symbols(session)
-        if not symbols:
-            console.print("[red]No available symbols for analysis.[/red]")
-            return
+class ResultWriter:
+    """Writes results to stdout for machine consumers instead of rendering tables.
+
+    Every analyzed symbol of a cycle is written for every setup of intervals, ranked by change, with
+    its position in the top table and the time since the cycle start when it was analyzed. Last results
+    of cold symbols that were not downloaded this cycle (--cold-every) are marked as reused. The ndjson
+    format writes every result as soon as it is analyzed and then a summary record of the cycle, json
+    writes one document per cycle and csv one row per result.
+    """
+
+    CSV_FIELDS = ['cycle_started', 'setup', 'rank', 'top_rank', 'symbol', 'category', 'change_percent',
+                  'change_percent_big_interval', 'price', 'marks', 'elapsed_ms', 'reused']
+
+    def __init__(self, output_format: str, stream=sys.stdout):
+        self.format = output_format
+        self.stream = stream
+        self.csv_writer = csv.DictWriter(stream, self.CSV_FIELDS, lineterminator='\n') if output_format == 'csv' else None
+        if self.csv_writer:
+            self.csv_writer.writeheader()
+        self.started_at = datetime.now()
+        self.started = time.monotonic()
+        self.elapsed_ms: Dict[str, float] = {}
+        self.reused: Set[str] = set()
+
+    def start_cycle(self):
+        self.started_at = datetime.now()
+        self.started = time.monotonic()
+        self.elapsed_ms = {}
+        self.reused = set()
+
+    def add(self, results: List[SymbolAnalysisResult], args: argparse.Namespace, reused: bool = False):
+        # Reused results were analyzed in an earlier cycle, so they have no elapsed time of this one
+        elapsed_ms = None if reused else round((time.monotonic() - self.started) * 1000, 1)
+        for result in results:
+            if reused:
+                self.reused.add(result.symbol)
+            else:
+                self.elapsed_ms[result.symbol] = elapsed_ms
+            if self.format == 'ndjson':
+                self._write_json({'type': 'result', 'cycle_started': self.started_at.isoformat(),
+                                  'setup': profile_label(args), **asdict(result), 'elapsed_ms': elapsed_ms,
+                                  'reused': reused})
+
+    def finish_cycle(self, results: List[SymbolAnalysisResult], top_results: List[SymbolAnalysisResult],
+                     args: argparse.Namespace):
+        top_ranks = {result.symbol: rank for rank, result in enumerate(top_results, 1)}
+        records = [
+            {
+                'cycle_started': self.started_at.isoformat(),
+                'setup': profile_label(args),
+                'rank': rank,
+                'top_rank': top_ranks.get(result.symbol),
+                **asdict(result),
+                'elapsed_ms': self.elapsed_ms.get(result.symbol),
+                'reused': result.symbol in self.reused
+            }
+            for rank, result in enumerate(sorted(results, key=lambda x: x.change_percent, reverse=True), 1)
+        ]
+        duration_ms = round((time.monotonic() - self.started) * 1000, 1)
+        reused = sum(result.symbol in self.reused for result in results)
+
+        if self.format == 'ndjson':
+            self._write_json({'type': 'cycle', 'cycle_started': self.started_at.isoformat(),
+                              'setup': profile_label(args), 'duration_ms': duration_ms,
+                              'analyzed': len(results) - reused, 'reused': reused,
+                              'top': [result.symbol for result in top_results]})
+        elif self.format == 'json':
+            self._write_json({'cycle_started': self.started_at.isoformat(), 'setup': profile_label(args),
+                              'duration_ms': duration_ms, 'results': records})
+        else:
+            for record in records:
+                self.csv_writer.writerow({**record, 'marks': ''.join(record['marks'])})
+            self.stream.flush()
+
+    def _write_json(self, record: Dict[str, Any]):
+        self.stream.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self.stream.flush()
+
+
+class TopRanker:
+    """Keeps the top boosters and losers while results arrive, in O(log N) per result.
+
+    Bounded heaps hold the N best boosters, losers and positive/negative neutrals (which fill up
+    the table when there are fewer than N boosters or losers), so the table can be built at any
+    time without sorting all results. Ties are kept in arrival order, like a stable sort would.
+    """
+
+    def __init__(self, top_count: int):
+        self.top_count = top_count
+        self.added = 0
+        self.heaps: Dict[str, List[Tuple[float, int, SymbolAnalysisResult]]] = {
+            'booster': [], 'loser': [], 'positive': [], 'negative': []
+        }
+
+    def add(self, result: SymbolAnalysisResult):
+        if result.category == 'neutral':
+            if result.change_percent == 0:
+                return
+            name = 'positive' if result.change_percent > 0 else 'negative'
+        else:
+            name = result.category
+        # Heaps keep the largest keys, boosters rank by the highest change and losers by the lowest
+        rising = name in ('booster', 'positive')
+        entry = (result.change_percent if rising else -result.change_percent, -self.added, result)
+        self.added += 1
+        heap = self.heaps[name]
+        if len(heap) < self.top_count:
+            heapq.heappush(heap, entry)
+        elif heap and entry[:2] > heap[0][:2]:
+            heapq.heapreplace(heap, entry)
+
+    def extend(self, results: List[SymbolAnalysisResult]):
+        for result in results:
+            self.add(result)
+
+    def _best(self, name: str, count: int) -> List[SymbolAnalysisResult]:
+        return [entry[2] for entry in heapq.nlargest(count, self.heaps[name], key=lambda entry: entry[:2])]
+
+    def top(self) -> List[SymbolAnalysisResult]:
+        boosters = self._best('booster', self.top_count)
+        # If less than N boosters, fill up from neutrals with positive change_percent
+        boosters += self._best('positive', self.top_count - len(boosters))
+        losers = self._best('loser', self.top_count)
+        # Similarly for losers, with negative change_percent
+        losers += self._best('negative', self.top_count - len(losers))
+        return sorted(boosters + losers, key=lambda x: x.change_percent, reverse=True)
+
+
+def rank_results(results: List[SymbolAnalysisResult], top_count: int) -> List[SymbolAnalysisResult]:
+    ranker = TopRanker(top_count)
+    ranker.extend(results)
+    return ranker.top()
+
+
+def quote_volumes(cache: KlineCache, symbols: List[str], profile: argparse.Namespace) -> Dict[str, float]:
+    # Traded quote volume in the current interval of the profile, of every symbol with cached candles
+    window = get_analysis_windows(profile)[-1:]
+    volumes = {}
+    for symbol in symbols:
+        klines = peek_windows(cache, symbol, window)
+        if klines:
+            volumes[symbol] = sum(map(float.__mul__, klines[0].close, klines[0].volume))
+    return volumes
+
+
+class SymbolScheduler:
+    """Order in which symbols are scanned, the ones most likely to make the top tables first.
+
+    The priority of a symbol is its largest change of the last scan in any setup, doubled for boosters
+    and losers and weighed by the quote volume of its current interval candles. Symbols without
+    results (new or not scanned yet) go first. Cold symbols are rescanned only every `cold_every`
+    cycles, and their last results are reused in between.
+    """
+
+    def __init__(self, profiles: List[argparse.Namespace], cold_every: int = 1):
+        self.profiles = profiles
+        self.cold_every = cold_every
+        self.cycle = 0
+        self.priorities: Dict[str, float] = {}
+        self.cold: Set[str] = set()
+        self.scanned_at: Dict[str, int] = {}
+        self.volumes: Dict[str, float] = {}
+        self.results: List[Dict[str, SymbolAnalysisResult]] = [{} for _ in profiles]
+
+    def plan(self, symbols: List[str]) -> List[str]:
+        # Symbols to scan in this cycle, sorted is stable so equal priorities keep the exchangeInfo order
+        self.cycle += 1
+        due = [symbol for symbol in symbols
+               if symbol not in self.cold or self.cycle - self.scanned_at.get(symbol, 0) >= self.cold_every]
+        for symbol in due:
+            self.scanned_at[symbol] = self.cycle
+        return sorted(due, key=lambda symbol: -self.priorities.get(symbol, math.inf))
+
+    def last_results(self, index: int, symbols: List[str]) -> List[SymbolAnalysisResult]:
+        return [self.results[index][symbol] for symbol in symbols if symbol in self.results[index]]
+
+    def update(self, results: List[List[SymbolAnalysisResult]], volumes: Dict[str, float]):
+        # Volumes are only given for the symbols scanned in this cycle, the others keep their last ones
+        self.volumes.update(volumes)
+        self.results = [{result.symbol: result for result in profile_results} for profile_results in results]
+        changes: Dict[str, float] = {}
+        hot = set()
+        for profile_results in results:
+            for result in profile_results:
+                changes[result.symbol] = max(changes.get(result.symbol, 0.0), abs(result.change_percent))
+                if result.category != 'neutral':
+                    hot.add(result.symbol)
+
+        priorities = {symbol: change * (2 if symbol in hot else 1) * math.log10(2 + self.volumes.get(symbol, 0.0))
+                      for symbol, change in changes.items()}
+        ranked = sorted(priorities, key=priorities.get)
+        self.cold = set(ranked[:int(len(ranked) * COLD_SYMBOLS_RATIO)]) - hot if self.cold_every > 1 else set()
+        self.priorities = priorities
+
+
+def parse_stream_kline(payload: Dict[str, Any]) -> Optional[Tuple[str, str, List[Any]]]:
+    # Convert a kline event of a combined stream into (symbol, interval, candle) in the REST klines format
+    data = payload.get('data', payload)
+    if data.get('e') != 'kline':
+        return None
+    kline = data['k']
+    return data['s'], kline['i'], [kline['t'], kline['o'], kline['h'], kline['l'], kline['c'], kline['v'], kline['T']]
+
 
+async def stream_klines(
+        session: aiohttp.ClientSession,
+        cache: KlineCache,
+        symbols: List[str],
+        plan: Dict[str, int],
+        on_update,
+        url: Optional[str] = None
+):
+    # The module URL is read on every call, so it can be pointed at a local stand-in
+    url = url or STREAM_URL
+    streams = [f"{symbol.lower()}@kline_{interval}" for symbol in symbols for interval in plan]
+    while True:
+        try:
+            async with session.ws_connect(f"{url}?streams={'/'.join(streams)}", heartbeat=30) as ws:
+                async for message in ws:
+                    if message.type != aiohttp.WSMsgType.TEXT:
+                        break
+                    update = parse_stream_kline(message.json(loads=decode_json))
+                    if update and cache.update(*update):
+                        on_update(update[0])
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError):
+            pass
+
+        # Connection is lost, fill the gap with REST requests before subscribing again
+        await asyncio.sleep(STREAM_RECONNECT_DELAY)
+        REQUEST_STATS.start_cycle()
+        for symbol in symbols:
+            for interval, limit in plan.items():
+                if await cache.get(session, symbol, interval, limit):
+                    on_update(symbol)
+
+
+async def stream(
+        session: aiohttp.ClientSession,
+        cache: KlineCache,
+        symbols: List[str],
+        results: List[List[SymbolAnalysisResult]],
+        profiles: List[argparse.Namespace],
+        writer: Optional[ResultWriter] = None,
+        url: Optional[str] = None
+):
+    """Keep the cached candles up to date from websocket streams and re-render the tables when the top changes."""
+    windows, positions = get_profile_windows(profiles)
+    plan = plan_kline_requests(windows)
+    latest: List[Dict[str, SymbolAnalysisResult]] = [{result.symbol: result for result in profile_results}
+                                                     for profile_results in results]
+    dirty = set()
+    changed = asyncio.Event()
+
+    def on_update(symbol: str):
+        dirty.add(symbol)
+        changed.set()
+
+    async def render():
+        last_rows = [None] * len(profiles)
         while True:
-            start_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            tasks = [
-                analyze_symbol_simple(session, symbol, args) if args.simple
-                else analyze_symbol(session, symbol, args)
-                for symbol in symbols
-            ]
-
-            results = []
-
-            with Progress(
-                    TextColumn("[progress.description]{task.description}"),
-                    BarColumn(),
-                    "[progress.percentage]{task.percentage:>1.0f}%",
-                    TimeRemainingColumn(),
-                    console=console
-            ) as progress:
-                task = progress.add_task(f"Analyzing {len(symbols)} symbols...", total=len(tasks))
-                for coro in asyncio.as_completed(tasks):
-                    result = await coro
-                    if result:
-                        results.append(result)
-                    progress.advance(task)
-
-            # Separate boosters, losers, and neutrals
-            boosters = [res for res in results if res.category == "booster"]
-            losers = [res for res in results if res.category == "loser"]
-            neutrals = [res for res in results if res.category == "neutral"]
-            # TOP N Limit for each category
-            top_count = args.count
-
-            boosters_sorted = sorted(boosters, key=lambda x: x.change_percent, reverse=True)
-            # If less than N boosters, fill up from neutrals with positive change_percent
-            if len(boosters_sorted) < top_count:
-                positive_neutrals = [res for res in neutrals if res.change_percent > 0]
-                positive_neutrals_sorted = sorted(positive_neutrals, key=lambda x: x.change_percent, reverse=True)
-                needed = top_count - len(boosters_sorted)
-                fillers = positive_neutrals_sorted[:needed]
-                boosters_sorted.extend(fillers)
+            await changed.wait()
+            changed.clear()
+            # Re-evaluate only symbols that got new candles since the last render
+            batch = []
+            for symbol in dirty:
+                data = peek_windows(cache, symbol, windows)
+                if data:
+                    batch.append((symbol, data))
+                for profile_latest in latest:
+                    profile_latest.pop(symbol, None)
+            dirty.clear()
+            if writer:
+                writer.start_cycle()
+            updated_results = evaluate_profiles(batch, profiles, positions)
+
+            for i, profile in enumerate(profiles):
+                latest[i].update((result.symbol, result) for result in updated_results[i])
+                if writer:
+                    writer.add(updated_results[i], profile)
+
+                final_results = rank_results(list(latest[i].values()), profile.count)
+                rows = [(res.symbol, res.category, f"{res.change_percent:.2f}", f"{res.price:.4f}") for res in final_results]
+                if rows != last_rows[i]:
+                    last_rows[i] = rows
+                    updated = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                    if writer:
+                        writer.finish_cycle(list(latest[i].values()), final_results, profile)
+                    else:
+                        console.print(create_table_simple(final_results, updated, profile) if profile.simple
+                                      else create_table(final_results, updated, profile))
+            await asyncio.sleep(STREAM_RENDER_INTERVAL)
+
+    chunks = [symbols[i:i + STREAMS_PER_CONNECTION // len(plan)]
+              for i in range(0, len(symbols), STREAMS_PER_CONNECTION // len(plan))]
+    await asyncio.gather(render(), *(stream_klines(session, cache, chunk, plan, on_update, url) for chunk in chunks))
+
+
+async def scan_symbols(
+        session: aiohttp.ClientSession,
+        cache: KlineCache,
+        symbols: List[str],
+        profiles: List[argparse.Namespace],
+        writer: Optional[ResultWriter] = None,
+        show_progress: bool = True,
+        rankers: Optional[List[TopRanker]] = None,
+        preview: Optional[Callable[[int, int], RenderableType]] = None,
+        deadline: Optional[float] = None,
+        missed: Optional[List[str]] = None
+) -> List[List[SymbolAnalysisResult]]:
+    """Download candles of all symbols once for all profiles and return the results of every profile.
+
+    Results are also added to the rankers of the profiles (if given) as soon as they are analyzed.
+    With a preview, what it renders for the (done, total) symbols so far is shown above the progress
+    bar and updated while the scan runs, then removed once it's finished.
+    With a deadline (in seconds), symbols still downloading by then are cancelled and added to missed,
+    the results are only of the symbols that completed.
+    """
+    windows, positions = get_profile_windows(profiles)
+    deadline_at = time.monotonic() + deadline if deadline is not None else None
+    # Tasks are taken from the queue in the order they complete, those left in pending are unfinished
+    completed: asyncio.Queue = asyncio.Queue()
+    pending: Dict[asyncio.Task, str] = {}
+    for symbol in symbols:
+        task = asyncio.create_task(fetch_symbol_windows(session, cache, symbol, windows))
+        task.add_done_callback(completed.put_nowait)
+        pending[task] = symbol
+    # Records are streamed one by one in ndjson
+    batch_size = 1 if profiles[0].output == 'ndjson' else ANALYSIS_BATCH_SIZE
+
+    results: List[List[SymbolAnalysisResult]] = [[] for _ in profiles]
+    fetched = []
+
+    def analyze():
+        for i, analyzed in enumerate(evaluate_profiles(fetched, profiles, positions)):
+            results[i].extend(analyzed)
+            if rankers:
+                rankers[i].extend(analyzed)
+            if writer:
+                writer.add(analyzed, profiles[i])
+        fetched.clear()
+
+    progress = Progress(
+        TextColumn("[progress.description]{task.description}"),
+        BarColumn(),
+        "[progress.percentage]{task.percentage:>1.0f}%",
+        TimeRemainingColumn(),
+        # Keep stdout clean for machine readable output
+        console=console if writer is None else Console(stderr=True),
+        disable=not show_progress
+    )
+    # The progress bar renders inside the live display when there is a preview
+    display = Live(progress, console=progress.console, transient=True) if preview and show_progress else progress
+    previewed_at = time.monotonic()
+
+    with display:
+        progress_task = progress.add_task(f"Analyzing {len(symbols)} symbols...", total=len(symbols))
+        for done in range(1, len(symbols) + 1):
+            if completed.empty() and deadline_at is not None:
+                try:
+                    task = await asyncio.wait_for(completed.get(), deadline_at - time.monotonic())
+                except asyncio.TimeoutError:
+                    break
             else:
-                boosters_sorted = boosters_sorted[:top_count]
-
-            # Similarly for losers
-            losers_sorted = sorted(losers, key=lambda x: x.change_percent)
-            # If less than N losers, fill up from neutrals with negative change_percent
-            if len(losers_sorted) < top_count:
-                negative_neutrals = [res for res in neutrals if res.change_percent < 0]
-                negative_neutrals_sorted = sorted(negative_neutrals, key=lambda x: x.change_percent)
-                needed = top_count - len(losers_sorted)
-                fillers = negative_neutrals_sorted[:needed]
-                losers_sorted.extend(fillers)
+                task = await completed.get()
+            del pending[task]
+            symbol_windows = task.result()
+            if symbol_windows:
+                fetched.append(symbol_windows)
             else:
-                losers_sorted = losers_sorted[:top_count]
-
-            # Ensure we have only top N in each
-            boosters_sorted = boosters_sorted[:top_count]
-            losers_sorted = losers_sorted[:top_count]
-
-            # Combine results
-            final_results = boosters_sorted + losers_sorted
-            final_results = sorted(final_results, key=lambda x: x.change_percent, reverse=True)
-
-            # Create table
-            table = create_table_simple(final_results, start_time, args) if args.simple \
-                else create_table(final_results, start_time, args)
+                METRICS.inc('hotcold_symbols_failed_total')
+            # Candles are analyzed in batches instead of between every two responses,
+            # or earlier when it's time to update the preview
+            previewing = display is not progress and time.monotonic() - previewed_at >= PREVIEW_RENDER_INTERVAL
+            if len(fetched) >= batch_size or previewing:
+                analyze()
+            if previewing:
+                display.update(Group(preview(done, len(symbols)), progress))
+                previewed_at = time.monotonic()
+            progress.advance(progress_task)
+        analyze()
+
+    if pending:
+        # Stragglers of the deadline, their requests give back the limiter weight when cancelled
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        if missed is not None:
+            missed.extend(pending.values())
+    return results
+
+
+class ScanServer:
+    """HTTP API answering scans from one warm session, candle cache and symbol list.
+
+    `GET /scan?current=20m&short=4h&big=3d&count=10` returns the top symbols as JSON (all analyzed
+    symbols too with `all=1`), the simple mode is used when `short` and `big` are omitted. Only the
+    given `symbols` (comma separated) are scanned when they are listed, which is how a coordinator
+    with --remote hands its shard to this instance. Identical scans requested while one is already
+    running wait for its results instead of starting another.
+    """
+
+    def __init__(self, session: aiohttp.ClientSession, cache: KlineCache, symbol_cache: SymbolCache,
+                 args: argparse.Namespace):
+        self.session = session
+        self.cache = cache
+        self.symbol_cache = symbol_cache
+        self.args = args
+        self.in_flight: Dict[Tuple[Any, ...], asyncio.Task] = {}
+
+    async def run(self, host: str, port: int):
+        app = web.Application()
+        app.router.add_get('/scan', self.handle_scan)
+        app.router.add_get('/health', self.handle_health)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        try:
+            await web.TCPSite(runner, host, port).start()
+            await asyncio.Event().wait()
+        finally:
+            await runner.cleanup()
+
+    async def handle_health(self, request: web.Request) -> web.Response:
+        return web.json_response({'symbols': len(self.symbol_cache.symbols), 'scans_in_flight': len(self.in_flight)})
+
+    async def handle_scan(self, request: web.Request) -> web.Response:
+        try:
+            args = self.scan_args(request.query)
+        except ValueError as error:
+            return web.json_response({'error': str(error)}, status=400)
+
+        coalesced = self.scan_key(args) in self.in_flight
+        started_at, duration_ms, results, missed = await self.scan(args)
+        top_results = rank_results(results, args.count)
+        response = {
+            'started': started_at.isoformat(),
+            'duration_ms': duration_ms,
+            'coalesced': coalesced,
+            'analyzed': len(results),
+            'missed': missed,
+            'top': [asdict(result) for result in top_results]
+        }
+        if request.query.get('all') in ('1', 'true'):
+            response['results'] = [asdict(result) for result in
+                                   sorted(results, key=lambda x: x.change_percent, reverse=True)]
+            response['volumes'] = quote_volumes(self.cache, [result.symbol for result in results], args)
+        return web.json_response(response, dumps=lambda data: json.dumps(data, ensure_ascii=False))
+
+    def scan_args(self, query) -> argparse.Namespace:
+        # Options of the command line are the defaults for every request
+        args = argparse.Namespace(**vars(self.args))
+        args.current_interval = query.get('current', args.current_interval)
+        args.simple = 'short' not in query and 'big' not in query or query.get('simple') in ('1', 'true')
+        args.short_interval = query.get('short', args.short_interval)
+        args.big_interval = query.get('big', args.big_interval)
+        for interval in (args.current_interval, args.short_interval, args.big_interval):
+            parse_timeframe(interval)
+        args.count = int(query.get('count', args.count))
+        if args.count < 1:
+            raise ValueError("count must be positive")
+        if 'no_spikes' in query:
+            args.no_spikes = query['no_spikes'] in ('1', 'true')
+        if 'spike_threshold' in query:
+            args.spike_threshold = float(query['spike_threshold'].strip('%'))
+        args.symbols = query['symbols'].split(',') if query.get('symbols') else None
+        if 'deadline' in query:
+            args.deadline = parse_duration(query['deadline'])
+        return args
+
+    @staticmethod
+    def scan_key(args: argparse.Namespace) -> Tuple[Any, ...]:
+        # The number of symbols to show only affects ranking, not what has to be downloaded
+        intervals = (args.current_interval,) if args.simple else \
+            (args.current_interval, args.short_interval, args.big_interval)
+        return intervals + (args.no_spikes, args.spike_threshold, args.prefilter, args.deadline,
+                            tuple(args.symbols or ()))
+
+    async def scan(self, args: argparse.Namespace) -> Tuple[datetime, float, List[SymbolAnalysisResult], List[str]]:
+        key = self.scan_key(args)
+        task = self.in_flight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._scan(args))
+            self.in_flight[key] = task
+            task.add_done_callback(lambda _: self.in_flight.pop(key, None))
+        # A client disconnecting must not cancel the scan other clients are waiting for
+        return await asyncio.shield(task)
+
+    async def _scan(self, args: argparse.Namespace) -> Tuple[datetime, float, List[SymbolAnalysisResult], List[str]]:
+        started_at = datetime.now()
+        started = time.monotonic()
+        # Scans run concurrently, each one with its own counters and retry deadline (set in its own task)
+        request_stats = RequestStats()
+        request_stats.start_cycle(args.deadline if args.deadline is not None else CYCLE_RETRY_DEADLINE)
+        _request_stats.set(request_stats)
+        symbols = args.symbols or await self.symbol_cache.get(self.session)
+        if args.prefilter and not args.symbols:
+            symbols = await prefilter_symbols(self.session, symbols, args.prefilter)
+        missed: List[str] = []
+        results = (await scan_symbols(self.session, self.cache, symbols, [args], show_progress=False,
+                                      deadline=args.deadline, missed=missed))[0]
+        if self.cache.store:
+            self.cache.store.prune()
+        return started_at, round((time.monotonic() - started) * 1000, 1), results, missed
+
+
+# Event loop, session and candles of a --workers process, kept between the shards it scans
+_worker_state: Dict[str, Any] = {}
+
+
+def init_worker(weight_share: float, keepalive_timeout: float, store_path: Optional[str]):
+    # Interrupts are handled by the coordinator, which shuts the workers down
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    store = KlineStore(store_path) if store_path else None
+    _worker_state.update(loop=asyncio.new_event_loop(), session=None, cache=KlineCache(store),
+                         keepalive_timeout=keepalive_timeout, weight_share=weight_share)
+
+
+def scan_worker_shard(symbols: List[str], profiles: List[argparse.Namespace],
+                      deadline: Optional[float]) -> Dict[str, Any]:
+    return _worker_state['loop'].run_until_complete(_scan_worker_shard(symbols, profiles, deadline))
+
+
+async def _scan_worker_shard(symbols: List[str], profiles: List[argparse.Namespace],
+                             deadline: Optional[float]) -> Dict[str, Any]:
+    if _worker_state['session'] is None:
+        # The first shard sets up the loop of the worker, which is kept for the next ones
+        get_limiter().set_share(_worker_state['weight_share'])
+        _worker_state['session'] = create_session(_worker_state['keepalive_timeout'])
+    REQUEST_STATS.start_cycle(deadline if deadline is not None else CYCLE_RETRY_DEADLINE)
+    missed: List[str] = []
+    cache = _worker_state['cache']
+    results = await scan_symbols(_worker_state['session'], cache, symbols, profiles,
+                                 show_progress=False, deadline=deadline, missed=missed)
+    if cache.store:
+        cache.store.prune()
+    # Plain data, so results don't depend on the module the classes are pickled from
+    return {
+        'results': [[asdict(result) for result in profile_results] for profile_results in results],
+        'missed': missed,
+        'volumes': quote_volumes(cache, symbols, profiles[0]),
+        'requests': {path: asdict(stats) for path, stats in REQUEST_STATS.endpoints.items()}
+    }
 
-            console.print(table)
 
-            if not args.watch:
-                break
+class ShardedScanner:
+    """Splits every scan into shards for worker processes (--workers) and other instances (--remote).
+
+    A symbol always goes to the same shard (by a hash of its name), so the candle caches of workers
+    and remote instances stay warm between watch cycles. Workers split the request weight share of
+    this host between them, remote instances with --serve scan with the limits of their own hosts.
+    Results are merged into the rankers of the coordinator as soon as a shard is done. The shard of
+    a worker or remote instance that failed is left out of the cycle (like the symbols cut off by a
+    deadline) and a broken worker process is replaced.
+    """
+
+    def __init__(self, workers: int, remotes: List[str], weight_share: float, keepalive_timeout: float,
+                 store_path: Optional[str] = None):
+        self.worker_args = (weight_share / workers if workers else weight_share, keepalive_timeout, store_path)
+        self.executors = [self._create_executor() for _ in range(workers)]
+        self.remotes = [url.rstrip('/') for url in remotes]
+
+    def _create_executor(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(1, mp_context=multiprocessing.get_context('spawn'), initializer=init_worker,
+                                   initargs=self.worker_args)
+
+    def _submit(self, index: int, *args: Any) -> asyncio.Future:
+        loop = asyncio.get_running_loop()
+        try:
+            return loop.run_in_executor(self.executors[index], scan_worker_shard, *args)
+        except BrokenProcessPool:
+            # The worker died since its last shard
+            self.executors[index] = self._create_executor()
+            return loop.run_in_executor(self.executors[index], scan_worker_shard, *args)
+
+    def shards(self, symbols: List[str]) -> List[List[str]]:
+        shards: List[List[str]] = [[] for _ in range(len(self.executors) + len(self.remotes))]
+        for symbol in symbols:
+            shards[zlib.crc32(symbol.encode()) % len(shards)].append(symbol)
+        return shards
+
+    async def scan(
+            self,
+            session: aiohttp.ClientSession,
+            symbols: List[str],
+            profiles: List[argparse.Namespace],
+            rankers: List[TopRanker],
+            writer: Optional[ResultWriter] = None,
+            deadline: Optional[float] = None,
+            missed: Optional[List[str]] = None,
+            volumes: Optional[Dict[str, float]] = None
+    ) -> List[List[SymbolAnalysisResult]]:
+        shards = self.shards(symbols)
+        # Shard and the index of its worker (None for remote instances) by the future of its scan
+        pending: Dict[asyncio.Future, Tuple[List[str], Optional[int]]] = {}
+        for index, shard in enumerate(shards[:len(self.executors)]):
+            pending[self._submit(index, shard, profiles, deadline)] = (shard, index)
+        for url, shard in zip(self.remotes, shards[len(self.executors):]):
+            pending[asyncio.ensure_future(self._scan_remote(session, url, shard, profiles, deadline))] = (shard, None)
+
+        results: List[List[SymbolAnalysisResult]] = [[] for _ in profiles]
+        progress = Progress(
+            TextColumn("[progress.description]{task.description}"),
+            BarColumn(),
+            "[progress.percentage]{task.percentage:>1.0f}%",
+            TimeRemainingColumn(),
+            console=console if writer is None else Console(stderr=True)
+        )
+        with progress:
+            task = progress.add_task(f"Analyzing {len(symbols)} symbols in {len(shards)} shards...", total=len(symbols))
+            while pending:
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for future in done:
+                    shard, index = pending.pop(future)
+                    try:
+                        scanned = future.result()
+                    except Exception as error:
+                        if isinstance(error, BrokenProcessPool) and index is not None:
+                            self.executors[index] = self._create_executor()
+                        METRICS.inc('hotcold_symbols_failed_total', len(shard))
+                        if missed is not None:
+                            missed.extend(shard)
+                        progress.advance(task, len(shard))
+                        continue
+                    for i, profile_results in enumerate(scanned['results']):
+                        analyzed = [SymbolAnalysisResult(**record) for record in profile_results]
+                        results[i].extend(analyzed)
+                        rankers[i].extend(analyzed)
+                        if writer:
+                            writer.add(analyzed, profiles[i])
+                    for path, counts in scanned['requests'].items():
+                        stats = REQUEST_STATS.endpoints.setdefault(path, EndpointStats())
+                        stats.requests += counts['requests']
+                        stats.retries += counts['retries']
+                        stats.failures += counts['failures']
+                    if missed is not None:
+                        missed.extend(scanned['missed'])
+                    if volumes is not None:
+                        volumes.update(scanned['volumes'])
+                    progress.advance(task, len(shard))
+        return results
+
+    async def _scan_remote(self, session: aiohttp.ClientSession, url: str, symbols: List[str],
+                           profiles: List[argparse.Namespace], deadline: Optional[float]) -> Dict[str, Any]:
+        # One scan of the shard per setup, the remote instance downloads the candles for all of them once
+        scanned: Dict[str, Any] = {'results': [], 'missed': [], 'volumes': {}, 'requests': {}}
+        stats = {'requests': 0, 'retries': 0, 'failures': 0}
+        scanned['requests'][f"{urlparse(url).path}/scan"] = stats
+        for profile in profiles:
+            params = {'current': profile.current_interval, 'count': profile.count, 'all': 1,
+                      'no_spikes': int(profile.no_spikes), 'spike_threshold': profile.spike_threshold,
+                      'symbols': ','.join(symbols)}
+            if profile.simple:
+                params['simple'] = 1
+            else:
+                params.update(short=profile.short_interval, big=profile.big_interval)
+            if deadline is not None:
+                params['deadline'] = deadline
+            stats['requests'] += 1
+            try:
+                async with session.get(f"{url}/scan", params=params) as response:
+                    response.raise_for_status()
+                    data = await response.json(loads=decode_json)
+            except (aiohttp.ClientError, asyncio.TimeoutError, ValueError):
+                # Symbols of a failed shard are missing from this cycle, like the ones cut off by a deadline
+                stats['failures'] += 1
+                METRICS.inc('hotcold_symbols_failed_total', len(symbols))
+                scanned['results'].append([])
+                scanned['missed'] = list(dict.fromkeys(scanned['missed'] + symbols))
+                continue
+            scanned['results'].append(data['results'])
+            scanned['missed'] = list(dict.fromkeys(scanned['missed'] + data['missed']))
+            scanned['volumes'].update(data.get('volumes', {}))
+        return scanned
+
+    def close(self):
+        for executor in self.executors:
+            executor.shutdown(wait=False, cancel_futures=True)
 
-            await asyncio.sleep(args.wait)
 
+async def main(args: argparse.Namespace):
+    # Machine readable output goes to stdout, human-readable messages to stderr then
+    writer = ResultWriter(args.output) if args.output != 'table' else None
+    log_console = Console(stderr=True) if writer else console
+    PROFILER.enabled = args.profile or bool(args.profile_json)
+    METRICS.enabled = bool(args.metrics_port)
+    get_limiter().set_share(args.weight_share)
 
-if __name__ == '__main__':
+    # Human-readable message
+    if args.serve:
+        log_console.print(f"\n[bold]Serving scans on [yellow]http://{args.host}:{args.serve}/scan[/yellow][/bold]\n")
+    else:
+        for profile in args.profiles:
+            if profile.simple:
+                log_console.print(
+                    f"\n[bold]Searching where the current price is different on last [yellow]{profile.current_interval}[/yellow] interval[/bold]")
+            else:
+                log_console.print(
+                f"\n[bold]Searching where the last [yellow]{profile.current_interval}[/yellow] price is different on last [yellow]{profile.short_interval}[/yellow] and [yellow]{profile.big_interval}[/yellow] intervals[/bold]")
+        log_console.print()
+
+    # Klines are kept between watch cycles, so only new candles are downloaded after the first one
+    cache_dir = os.path.expanduser(args.cache_dir) if args.cache_dir else None
+    # With --workers and --remote candles are kept (and stored) by the processes that download them
+    store = KlineStore(os.path.join(cache_dir, 'klines.sqlite')) if cache_dir and not (args.workers or args.remote) else None
+    cache = KlineCache(store)
+    symbol_cache = SymbolCache(os.path.join(cache_dir, 'exchange_info.json') if cache_dir else None)
+    # Snapshots replace klines only when there is nothing else to download them for
+    snapshots_profile = args.profiles[0] if args.snapshots else None
+    price_history = PriceHistory(snapshots_profile.current_interval) if snapshots_profile else None
+    symbols_refresh = None
+    metrics_server = None
+    # Connections are kept alive between watch cycles, so every cycle doesn't start with new handshakes
+    keepalive_timeout = max(KEEPALIVE_TIMEOUT, args.wait + KEEPALIVE_MARGIN) if args.watch else KEEPALIVE_TIMEOUT
+    sharded = ShardedScanner(args.workers, args.remote, args.weight_share, keepalive_timeout,
+                             os.path.join(cache_dir, 'klines.sqlite') if cache_dir else None) \
+        if args.workers or args.remote else None
 
+    try:
+        if args.metrics_port:
+            metrics_server = await start_metrics_server(args.host, args.metrics_port)
+        async with create_session(keepalive_timeout) as session:
+            # Fetching symbol list
+            symbols = await symbol_cache.get(session)
+            if not symbols:
+                log_console.print("[red]No available symbols for analysis.[/red]")
+                return
+            if args.watch or args.serve:
+                symbols_refresh = asyncio.create_task(symbol_cache.refresh_periodically(session))
+
+            if args.serve:
+                await ScanServer(session, cache, symbol_cache, args).run(args.host, args.serve)
+                return
+
+            def preview_tables(done: int, total: int) -> RenderableType:
+                # Provisional top of the symbols analyzed so far in this cycle
+                updated = f"{start_time} ([yellow]{done} of {total} symbols[/yellow])"
+                return Group(*(create_table_simple(ranker.top(), updated, profile) if profile.simple
+                               else create_table(ranker.top(), updated, profile)
+                               for profile, ranker in zip(args.profiles, rankers)))
+
+            scheduler = SymbolScheduler(args.profiles, args.cold_every if args.watch else 1)
+            # Symbols cut off by the deadline of the last cycle, they are scanned first in the next one
+            missed: List[str] = []
+
+            while True:
+                start_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                cycle_started = time.monotonic()
+                symbols = symbol_cache.symbols
+                REQUEST_STATS.start_cycle(args.deadline if args.deadline is not None else CYCLE_RETRY_DEADLINE)
+                PROFILER.start_cycle()
+                if writer:
+                    writer.start_cycle()
+                rankers = [TopRanker(profile.count) for profile in args.profiles]
+                reused_count = 0
+                if price_history and await price_history.update(session) and price_history.is_warm():
+                    # Enough snapshots, no need to download klines
+                    with PROFILER.measure('analysis', len(symbols)):
+                        results = [evaluate_batch([(symbol, [price_history.klines(symbol)]) for symbol in symbols],
+                                                  snapshots_profile)]
+                    rankers[0].extend(results[0])
+                    if writer:
+                        writer.add(results[0], snapshots_profile)
+                else:
+                    if args.prefilter:
+                        symbols = await prefilter_symbols(session, symbols, args.prefilter)
+                    listed, symbols = symbols, scheduler.plan(symbols)
+                    if missed:
+                        available, first = set(symbols), set(missed)
+                        symbols = [symbol for symbol in missed if symbol in available] + \
+                                  [symbol for symbol in symbols if symbol not in first]
+                        missed = []
+                    deadline = None
+                    if args.deadline is not None:
+                        deadline = max(cycle_started + args.deadline - time.monotonic(), 0.0)
+                    if sharded:
+                        volumes: Dict[str, float] = {}
+                        results = await sharded.scan(session, symbols, args.profiles, rankers, writer,
+                                                     deadline=deadline, missed=missed, volumes=volumes)
+                    else:
+                        results = await scan_symbols(session, cache, symbols, args.profiles, writer, rankers=rankers,
+                                                     preview=None if writer else preview_tables,
+                                                     deadline=deadline, missed=missed)
+                        volumes = quote_volumes(cache, symbols, args.profiles[0])
+                    # Cold symbols left out of this cycle are ranked by their last results
+                    scanned = set(symbols)
+                    skipped = [symbol for symbol in listed if symbol not in scanned]
+                    for i, ranker in enumerate(rankers):
+                        reused = scheduler.last_results(i, skipped)
+                        results[i].extend(reused)
+                        ranker.extend(reused)
+                        if writer:
+                            writer.add(reused, args.profiles[i], reused=True)
+                        if i == 0:
+                            reused_count = len(reused)
+                    scheduler.update(results, volumes)
+
+                for profile, profile_results, ranker in zip(args.profiles, results, rankers):
+                    with PROFILER.measure('ranking', len(profile_results)):
+                        final_results = ranker.top()
+                    for category in ('booster', 'loser', 'neutral'):
+                        METRICS.set('hotcold_symbols_by_category', sum(res.category == category for res in profile_results),
+                                    setup=profile_label(profile), category=category)
+
+                    with PROFILER.measure('render'):
+                        if writer:
+                            writer.finish_cycle(profile_results, final_results, profile)
+                        else:
+                            # Create table
+                            table = create_table_simple(final_results, start_time, profile) if profile.simple \
+                                else create_table(final_results, start_time, profile)
+
+                            console.print(table)
+                if missed:
+                    METRICS.inc('hotcold_symbols_missed_total', len(missed))
+                    shown = ', '.join(missed[:MISSED_SYMBOLS_SHOWN]) + (', ...' if len(missed) > MISSED_SYMBOLS_SHOWN else '')
+                    log_console.print(f"[yellow]{len(missed)} symbols were left out of this update: {shown}[/yellow]")
+                if REQUEST_STATS.failures:
+                    log_console.print(f"[yellow]{REQUEST_STATS.failures} requests failed "
+                                  f"after {REQUEST_STATS.retries} retries[/yellow]")
+                if store:
+                    store.prune()
+                METRICS.inc('hotcold_cycles_total')
+                METRICS.observe('hotcold_cycle_duration_seconds', time.monotonic() - cycle_started)
+                METRICS.set('hotcold_symbols_analyzed', len(results[0]) - reused_count)
+                if PROFILER.enabled:
+                    log_console.print(PROFILER.create_table())
+                    if args.profile_json:
+                        PROFILER.export(args.profile_json)
+
+                # The first scan seeds the candles, from now on they only come from the websocket streams
+                if args.stream:
+                    await stream(session, cache, symbols, results, args.profiles, writer)
+                    break
+
+                if not args.watch:
+                    break
+
+                await asyncio.sleep(args.wait)
+    finally:
+        if symbols_refresh:
+            symbols_refresh.cancel()
+        if metrics_server:
+            await metrics_server.cleanup()
+        if sharded:
+            sharded.close()
+        if store:
+            store.close()
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
     # A sentinel value to check if the argument was provided by the user
     SENTINEL = object()
     sentinel_defaults = {
+        'current_interval': '8h',
         'short_interval': '2d',
         'big_interval': '4d',
     }
 
     parser = argparse.ArgumentParser(description='Analyze price changes of USDT coins on Binance Futures.')
-    parser.add_argument('current_interval', nargs='?', default='8h', help='Current interval (e.g., 1m, 5m)')
+    parser.add_argument('current_interval', nargs='?', default=SENTINEL, help='Current interval (e.g., 1m, 5m)')
     parser.add_argument('short_interval', nargs='?', default=SENTINEL, help='Short interval (e.g., 15m, 1h)')
     parser.add_argument('big_interval', nargs='?', default=SENTINEL, help='Big interval (e.g., 4h, 1d)')
     parser.add_argument('--simple', action='store_true',    help='Simple mode, compare last price with time interval')
     parser.add_argument('--watch', action='store_true', help='Continuous monitoring mode')
+    parser.add_argument('--stream', action='store_true', help='Real-time mode, update candles from websocket streams')
     parser.add_argument('--no-spikes', action='store_true',   help="Don't show symbols if they have spike more than given threshold")
     parser.add_argument('--spike-threshold', type=str, default='5%', help='Threshold for spike detection')
     parser.add_argument('--wait', type=float, default=30.0, help='Update interval in seconds')
     parser.add_argument('--count', type=int, default=5, help='Number of symbols to display in each category')
-
-    args = parser.parse_args()
+    parser.add_argument('--output', choices=['table', 'json', 'ndjson', 'csv'], default='table',
+                        help='Output format, machine readable formats include all analyzed symbols')
+    parser.add_argument('--setup', action='append', default=[], metavar='INTERVALS',
+                        help='Another setup of intervals to analyze at the same time (e.g., 20m,4h,3d or 40m), can be repeated')
+    parser.add_argument('--serve', type=int, default=None, metavar='PORT',
+                        help='Run an HTTP API answering scans on this port instead of scanning once')
+    parser.add_argument('--metrics-port', type=int, default=None, metavar='PORT',
+                        help='Expose Prometheus metrics on this port (useful with --watch)')
+    parser.add_argument('--host', type=str, default='127.0.0.1', help='Address for --serve and --metrics-port to listen on')
+    parser.add_argument('--profile', action='store_true', help='Show how long every stage of an update took')
+    parser.add_argument('--profile-json', type=str, default=None, metavar='PATH',
+                        help='Save the profile of every update to this JSON file')
+    parser.add_argument('--cache-dir', type=str, default=None, help='Directory to keep downloaded data between runs')
+    parser.add_argument('--snapshots', action='store_true',
+                        help='Simple mode with --watch, collect prices of all symbols in one request per update')
+    parser.add_argument('--prefilter', type=int, default=None,
+                        help='Analyze only this number of symbols that moved the most in the last 24 hours')
+    parser.add_argument('--workers', type=int, default=0,
+                        help='Split the symbols between this number of processes to use more CPU cores')
+    parser.add_argument('--remote', action='append', default=[], metavar='URL',
+                        help='Also split the symbols with an instance running with --serve at this URL (repeatable)')
+    parser.add_argument('--weight-share', type=float, default=1.0,
+                        help='Share of the Binance request weight limit of the IP to use (e.g., 0.5 for one of two hosts)')
+    parser.add_argument('--cold-every', type=int, default=1, metavar='N',
+                        help='In watch mode, rescan symbols that barely move only every N updates')
+    parser.add_argument('--deadline', type=str, default=None,
+                        help='Show the results of the symbols analyzed within this time (e.g., 3s), the rest go first next time')
+
+    args = parser.parse_args(argv)
+    # Intervals given as positional arguments are one more setup, the only one by default
+    has_intervals = args.current_interval is not SENTINEL or not args.setup
 
     # Fix simple mode flag (auto enable)
     is_simple_mode = args.short_interval == SENTINEL and args.big_interval == SENTINEL
@@ -481,9 +2520,38 @@ if __name__ == '__main__':
 
     # Set additional values
     args.spike_threshold = parse_percentage(str(args.spike_threshold))
+    if args.workers < 0:
+        parser.error("--workers can't be negative")
+    if not 0 < args.weight_share <= 1:
+        parser.error("--weight-share must be more than 0 and at most 1")
+    if (args.workers or args.remote) and (args.stream or args.serve):
+        parser.error("--workers and --remote can't be used with --stream or --serve")
+    if args.deadline is not None:
+        try:
+            args.deadline = parse_duration(args.deadline)
+        except ValueError as error:
+            parser.error(str(error))
     args.big_avg_ratio, args.short_avg_ratio = 0.5, 0.5
     args.max_concurrency = MAX_CONCURRENCY
 
+    args.profiles = [args] if has_intervals else []
+    for setup in args.setup:
+        intervals = setup.split(',')
+        if len(intervals) not in (1, 3):
+            parser.error(f"--setup needs 1 or 3 intervals, got {setup}")
+        for interval in intervals:
+            try:
+                parse_timeframe(interval)
+            except ValueError as error:
+                parser.error(str(error))
+        args.profiles.append(make_profile(args, intervals))
+    if args.snapshots and not (args.watch and len(args.profiles) == 1 and args.profiles[0].simple):
+        parser.error("--snapshots needs --watch and a single interval of the simple mode")
+    return args
+
+
+if __name__ == '__main__':
+    args = parse_args()
     try:
         asyncio.run(main(args))
     except KeyboardInterrupt: